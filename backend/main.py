@@ -1,10 +1,12 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Dict, Any, Optional, List
 import logging
 import asyncio
 import os
+import json
 from dotenv import load_dotenv
 from datetime import datetime
 
@@ -37,6 +39,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Seconds between heartbeats on the /ws/health socket
+HEALTH_PUSH_INTERVAL = 30
+
 # Global Q&A pipeline instance
 qa_pipeline = None
 
@@ -99,6 +104,22 @@ async def health_check():
         "timestamp": "2024-01-01T00:00:00Z"
     }
 
+@app.websocket("/ws/health")
+async def health_socket(websocket: WebSocket):
+    """
+    Push health status over a persistent connection
+    
+    Sends {"ok": true} on connect and a heartbeat afterwards; clients treat a
+    dropped connection as the backend going offline.
+    """
+    await websocket.accept()
+    try:
+        while True:
+            await websocket.send_json({"ok": True, "timestamp": datetime.now().isoformat()})
+            await asyncio.sleep(HEALTH_PUSH_INTERVAL)
+    except WebSocketDisconnect:
+        pass
+
 @app.post("/qa/ask")
 async def ask_question(
     request: QuestionRequest,
@@ -124,16 +145,37 @@ async def ask_question(
             user_question=request.question,
             top_k=3
         )
-        print("result: ", result)
-        print("result keys:", result.keys())
-        print("result success:", result.get("success"))
-        print("result answer:", result.get("answer", "")[:100])  # First 100 chars
+        logger.debug("result keys: %s", list(result))
+        logger.debug("result success: %s, answer: %.100s", result.get("success"), result.get("answer", ""))
         return result
         
     except Exception as e:
         logger.error(f"Error processing question: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/qa/ask/stream")
+async def ask_question_stream(
+    request: QuestionRequest,
+    pipeline: QAPipeline = Depends(get_qa_pipeline)
+):
+    """
+    Streaming Q&A endpoint: same pipeline as /qa/ask, sent as newline-delimited JSON
+    
+    Emits {"type": "token", "content": ...} lines while the answer is generated,
+    followed by one {"type": "result", "data": ...} line with the full response
+    (or {"type": "error", "error": ...} on failure).
+    """
+    logger.info(f"Received streaming question: {request.question}")
+    
+    if not request.question.strip():
+        raise HTTPException(status_code=400, detail="Question cannot be empty")
+    
+    async def event_lines():
+        async for event in pipeline.answer_question_stream(user_question=request.question, top_k=3):
+            yield json.dumps(event) + "\n"
+    
+    return StreamingResponse(event_lines(), media_type="application/x-ndjson")
+
 @app.post("/content/index", response_model=ContentResponse)
 async def index_content(
     request: ContentRequest,
@@ -1,5 +1,6 @@
 import os
-from typing import List
+import threading
+from typing import List, Union
 import logging
 from sentence_transformers import SentenceTransformer
 import numpy as np
@@ -20,6 +21,9 @@ class EmbeddingService:
         self.model_name = model_name or os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
         self.model = None
         self.dimension = None
+        # The fast tokenizer and the forward pass are not safe to run from two
+        # threads at once, so every encode call goes through this lock
+        self._encode_lock = threading.Lock()
         
         self._load_model()
     
@@ -57,7 +61,8 @@ class EmbeddingService:
                 raise ValueError("Model not loaded")
             
             # Generate embedding
-            embedding = self.model.encode([text.strip()], convert_to_numpy=True)
+            with self._encode_lock:
+                embedding = self.model.encode([text.strip()], convert_to_numpy=True)
             
             # Convert to list and ensure it's float32
             embedding_list = embedding[0].astype(np.float32).tolist()
@@ -68,19 +73,23 @@ class EmbeddingService:
             self.logger.error(f"Error generating embedding for text: {e}")
             raise
     
-    def embed_texts(self, texts: List[str]) -> List[List[float]]:
+    def embed_texts(self, texts: List[str], batch_size: int = 64,
+                    as_numpy: bool = False) -> Union[List[List[float]], np.ndarray]:
         """
         Generate embeddings for multiple texts
         
         Args:
             texts: List of input texts to embed
+            batch_size: Number of texts encoded per forward pass
+            as_numpy: Return the float32 array from the model instead of lists
             
         Returns:
-            List of embeddings (each embedding is a list of floats)
+            List of embeddings (each embedding is a list of floats), or a 2D
+            float32 array when as_numpy is set
         """
         try:
             if not texts:
-                return []
+                return np.empty((0, self.dimension), dtype=np.float32) if as_numpy else []
             
             if self.model is None:
                 raise ValueError("Model not loaded")
@@ -89,10 +98,15 @@ class EmbeddingService:
             valid_texts = [text.strip() for text in texts if text and text.strip()]
             
             if not valid_texts:
-                return []
+                return np.empty((0, self.dimension), dtype=np.float32) if as_numpy else []
             
             # Generate embeddings
-            embeddings = self.model.encode(valid_texts, convert_to_numpy=True)
+            with self._encode_lock:
+                embeddings = self.model.encode(valid_texts, batch_size=batch_size, convert_to_numpy=True)
+            
+            if as_numpy:
+                self.logger.debug(f"Generated {len(embeddings)} embeddings")
+                return embeddings.astype(np.float32, copy=False)
             
             # Convert to list of lists
             embeddings_list = [emb.astype(np.float32).tolist() for emb in embeddings]
@@ -1,5 +1,5 @@
 import asyncio
-from typing import Dict, Any, List
+from typing import Dict, Any, List, AsyncIterator
 import logging
 from datetime import datetime
 import time
@@ -48,75 +48,129 @@ class QAPipeline:
             self.logger.info("Step 2: Generating answer with Gemini...")
             qa_result = self.qa_processor.generate_answer(user_question, search_results)
             
-            # Step 3: Generate follow-up suggestions
-            self.logger.info("Step 3: Generating follow-up suggestions...")
-            suggestions = self.qa_processor.generate_followup_suggestions(user_question, search_results)
+            return self._finalize_answer(user_question, qa_result, search_results, start_time)
             
-            # Step 4: Calculate accuracy metrics
-            processing_time = time.time() - start_time
-            self.logger.info("Step 4: Calculating accuracy metrics...")
+        except Exception as e:
+            self.logger.error(f"Error in Q&A pipeline: {e}")
+            return self._error_response(user_question, e)
+    
+    async def answer_question_stream(self, user_question: str, top_k: int = 3) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Q&A pipeline that yields the answer as Gemini generates it
+        
+        Args:
+            user_question: The user's question
+            top_k: Number of top chunks to retrieve from vector search (default: 3)
             
-            answer_text = qa_result.get("answer", "")
-            evaluation_metrics = self.evaluation_service.evaluate_query_response(
+        Yields:
+            {"type": "token", "content": ...} events for each piece of the answer,
+            then a single {"type": "result", "data": ...} event holding the same
+            response answer_question returns, or {"type": "error", "error": ...}
+        """
+        try:
+            start_time = time.time()
+            self.logger.info(f"Streaming answer for question: {user_question[:100]}...")
+            
+            search_results = await self.rag_pipeline.search_similar_content(
                 query=user_question,
-                answer=answer_text,
-                retrieved_chunks=search_results,
-                processing_time=processing_time
+                top_k=top_k
             )
             
-            # Step 5: Compile complete response with evaluation
-            complete_response = {
-                "question": user_question,
-                "answer": answer_text,
-                "success": qa_result.get("success", False),
-                "confidence": qa_result.get("confidence", "low"),
-                "sources": {
-                    "total_sources": qa_result.get("sources_used", 0),
-                    "source_details": qa_result.get("source_details", []),
-                    "search_results": [
-                        {
-                            "content_preview": result['metadata'].get('content', '')[:200] + "...",
-                            "content_type": result['metadata'].get('content_type', 'unknown'),
-                            "source": result['metadata'].get('source', 'unknown'),
-                            "similarity_score": round(result['score'], 3)
-                        }
-                        for result in search_results
-                    ]
-                },
-                "follow_up_suggestions": suggestions,
-                "accuracy_metrics": evaluation_metrics,
-                "processing_info": {
-                    "vector_search_results": len(search_results),
-                    "qa_success": qa_result.get("success", False),
-                    "processing_time_seconds": round(processing_time, 3),
-                    "processed_at": datetime.now().isoformat()
-                }
-            }
-            
-            # Add error information if available
-            if "error" in qa_result:
-                complete_response["error"] = qa_result["error"]
-            
-            self.logger.info(f"Q&A pipeline completed successfully for question: {user_question[:50]}... "
-                           f"Overall accuracy: {evaluation_metrics.get('overall_accuracy', {}).get('score', 0):.2f}")
-            return complete_response
+            # Gemini's stream is a blocking iterator, so advance it off the event loop;
+            # it ends with the same result dictionary generate_answer returns
+            loop = asyncio.get_running_loop()
+            stream = self.qa_processor.generate_answer_stream(user_question, search_results)
+            qa_result = None
+            while True:
+                piece = await loop.run_in_executor(None, next, stream, None)
+                if piece is None:
+                    break
+                if isinstance(piece, dict):
+                    qa_result = piece
+                    continue
+                yield {"type": "token", "content": piece}
+            
+            complete_response = await loop.run_in_executor(
+                None, self._finalize_answer, user_question, qa_result, search_results, start_time
+            )
+            yield {"type": "result", "data": complete_response}
             
         except Exception as e:
-            self.logger.error(f"Error in Q&A pipeline: {e}")
-            return {
-                "question": user_question,
-                "answer": "I'm sorry, I encountered an error while processing your question. Please try again.",
-                "success": False,
-                "confidence": "low",
-                "sources": {"total_sources": 0, "source_details": [], "search_results": []},
-                "follow_up_suggestions": [],
-                "error": str(e),
-                "processing_info": {
-                    "vector_search_results": 0,
-                    "qa_success": False,
-                    "processed_at": datetime.now().isoformat()
-                }
+            self.logger.error(f"Error in streaming Q&A pipeline: {e}")
+            yield {"type": "error", "error": str(e)}
+    
+    def _finalize_answer(self, user_question: str, qa_result: Dict[str, Any],
+                         search_results: List[Dict[str, Any]], start_time: float) -> Dict[str, Any]:
+        """Add follow-up suggestions and accuracy metrics to a generated answer"""
+        # Step 3: Generate follow-up suggestions
+        self.logger.info("Step 3: Generating follow-up suggestions...")
+        suggestions = self.qa_processor.generate_followup_suggestions(user_question, search_results)
+        
+        # Step 4: Calculate accuracy metrics
+        processing_time = time.time() - start_time
+        self.logger.info("Step 4: Calculating accuracy metrics...")
+        
+        answer_text = qa_result.get("answer", "")
+        evaluation_metrics = self.evaluation_service.evaluate_query_response(
+            query=user_question,
+            answer=answer_text,
+            retrieved_chunks=search_results,
+            processing_time=processing_time
+        )
+        
+        # Step 5: Compile complete response with evaluation
+        complete_response = {
+            "question": user_question,
+            "answer": answer_text,
+            "success": qa_result.get("success", False),
+            "confidence": qa_result.get("confidence", "low"),
+            "sources": {
+                "total_sources": qa_result.get("sources_used", 0),
+                "source_details": qa_result.get("source_details", []),
+                "search_results": [
+                    {
+                        "content_preview": result['metadata'].get('content', '')[:200] + "...",
+                        "content_type": result['metadata'].get('content_type', 'unknown'),
+                        "source": result['metadata'].get('source', 'unknown'),
+                        "similarity_score": round(result['score'], 3)
+                    }
+                    for result in search_results
+                ]
+            },
+            "follow_up_suggestions": suggestions,
+            "accuracy_metrics": evaluation_metrics,
+            "processing_info": {
+                "vector_search_results": len(search_results),
+                "qa_success": qa_result.get("success", False),
+                "processing_time_seconds": round(processing_time, 3),
+                "processed_at": datetime.now().isoformat()
+            }
+        }
+        
+        # Add error information if available
+        if "error" in qa_result:
+            complete_response["error"] = qa_result["error"]
+        
+        self.logger.info(f"Q&A pipeline completed successfully for question: {user_question[:50]}... "
+                       f"Overall accuracy: {evaluation_metrics.get('overall_accuracy', {}).get('score', 0):.2f}")
+        return complete_response
+    
+    def _error_response(self, user_question: str, error: Exception) -> Dict[str, Any]:
+        """Build the response returned when the Q&A pipeline fails"""
+        return {
+            "question": user_question,
+            "answer": "I'm sorry, I encountered an error while processing your question. Please try again.",
+            "success": False,
+            "confidence": "low",
+            "sources": {"total_sources": 0, "source_details": [], "search_results": []},
+            "follow_up_suggestions": [],
+            "error": str(error),
+            "processing_info": {
+                "vector_search_results": 0,
+                "qa_success": False,
+                "processed_at": datetime.now().isoformat()
             }
+        }
     
     async def get_system_status(self) -> Dict[str, Any]:
         """Get the status of all Q&A pipeline components"""
@@ -1,5 +1,5 @@
 import os
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterator, Union
 import logging
 from datetime import datetime
 import google.generativeai as genai
@@ -46,20 +46,9 @@ class QAProcessor:
             Dictionary containing the generated answer and metadata
         """
         try:
-            if not self.gemini_model:
-                return {
-                    "answer": "I'm sorry, but I'm currently unable to process your question. The Q&A service is not available.",
-                    "success": False,
-                    "error": "Gemini model not available"
-                }
-            
-            if not search_results:
-                return {
-                    "answer": "I couldn't find any relevant information to answer your question. Please try rephrasing your question or ask about a different topic.",
-                    "success": True,
-                    "sources_used": 0,
-                    "confidence": "low"
-                }
+            fallback = self._precheck_result(search_results)
+            if fallback is not None:
+                return fallback
             
             # Prepare context from search results
             context_info = self._prepare_context(search_results)
@@ -71,37 +60,107 @@ class QAProcessor:
             response = self.gemini_model.generate_content(prompt)
             
             if response and response.text:
-                answer = response.text.strip()
-                
-                return {
-                    "answer": answer,
-                    "success": True,
-                    "sources_used": len(search_results),
-                    "confidence": self._assess_confidence(search_results),
-                    "source_details": [
-                        {
-                            "content_type": result['metadata'].get('content_type', 'unknown'),
-                            "source": result['metadata'].get('source', 'unknown'),
-                            "similarity_score": round(result['score'], 3)
-                        }
-                        for result in search_results
-                    ],
-                    "processed_at": datetime.now().isoformat()
-                }
+                return self.build_answer_result(response.text.strip(), search_results)
             else:
-                return {
-                    "answer": "I'm having trouble generating a response right now. Please try again.",
-                    "success": False,
-                    "error": "Empty response from Gemini"
-                }
+                return self._empty_response_result()
                 
         except Exception as e:
             self.logger.error(f"Error generating answer: {e}")
+            return self._error_result(e)
+    
+    def generate_answer_stream(self, user_query: str,
+                               search_results: List[Dict[str, Any]]) -> Iterator[Union[str, Dict[str, Any]]]:
+        """
+        Stream an answer from Gemini as it is generated
+        
+        Args:
+            user_query: The user's question
+            search_results: Top chunks from vector search with scores and metadata
+            
+        Yields:
+            Pieces of answer text in generation order, then the result dictionary
+            generate_answer would return, including its fallback answers
+        """
+        try:
+            fallback = self._precheck_result(search_results)
+            if fallback is not None:
+                yield fallback
+                return
+            
+            context_info = self._prepare_context(search_results)
+            prompt = self._create_qa_prompt(user_query, context_info)
+            
+            answer_parts = []
+            for chunk in self.gemini_model.generate_content(prompt, stream=True):
+                # Safety-blocked and finish-only chunks have no parts; .text raises on them
+                if not chunk.parts:
+                    continue
+                if chunk.text:
+                    answer_parts.append(chunk.text)
+                    yield chunk.text
+            
+            answer = "".join(answer_parts).strip()
+            if answer:
+                yield self.build_answer_result(answer, search_results)
+            else:
+                yield self._empty_response_result()
+                
+        except Exception as e:
+            self.logger.error(f"Error streaming answer: {e}")
+            yield self._error_result(e)
+    
+    def _precheck_result(self, search_results: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """The answer to return without calling Gemini, or None if Gemini should be asked"""
+        if not self.gemini_model:
             return {
-                "answer": "I'm sorry, I encountered an error while processing your question. Please try again.",
+                "answer": "I'm sorry, but I'm currently unable to process your question. The Q&A service is not available.",
                 "success": False,
-                "error": str(e)
+                "error": "Gemini model not available"
             }
+        
+        if not search_results:
+            return {
+                "answer": "I couldn't find any relevant information to answer your question. Please try rephrasing your question or ask about a different topic.",
+                "success": True,
+                "sources_used": 0,
+                "confidence": "low"
+            }
+        
+        return None
+    
+    def _empty_response_result(self) -> Dict[str, Any]:
+        """Result returned when Gemini produces no text"""
+        return {
+            "answer": "I'm having trouble generating a response right now. Please try again.",
+            "success": False,
+            "error": "Empty response from Gemini"
+        }
+    
+    def _error_result(self, error: Exception) -> Dict[str, Any]:
+        """Result returned when answer generation fails"""
+        return {
+            "answer": "I'm sorry, I encountered an error while processing your question. Please try again.",
+            "success": False,
+            "error": str(error)
+        }
+    
+    def build_answer_result(self, answer: str, search_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Build the answer result dictionary for a successfully generated answer"""
+        return {
+            "answer": answer,
+            "success": True,
+            "sources_used": len(search_results),
+            "confidence": self._assess_confidence(search_results),
+            "source_details": [
+                {
+                    "content_type": result['metadata'].get('content_type', 'unknown'),
+                    "source": result['metadata'].get('source', 'unknown'),
+                    "similarity_score": round(result['score'], 3)
+                }
+                for result in search_results
+            ],
+            "processed_at": datetime.now().isoformat()
+        }
     
     def _prepare_context(self, search_results: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Prepare context information from search results"""
@@ -1,5 +1,6 @@
 import asyncio
-from typing import Dict, Any, List
+from functools import partial
+from typing import Dict, Any, List, Optional
 import logging
 from datetime import datetime
 
@@ -17,13 +18,17 @@ class RAGPipeline:
         self.embedding_service = UnifiedEmbeddingService()
         self.vector_store = VectorStore()
     
-    async def process_and_store_html(self, html_content: str, source_name: str) -> Dict[str, Any]:
+    async def process_and_store_html(self, html_content: str, source_name: str,
+                                     batch_size: int = 64,
+                                     pool_threads: Optional[int] = None) -> Dict[str, Any]:
         """
         Complete pipeline: HTML → Embeddings → Vector Store
         
         Args:
             html_content: HTML content to process
             source_name: Name of the source (used for metadata and identification)
+            batch_size: Chunks per embedding forward pass and per Pinecone upsert
+            pool_threads: Maximum concurrent Pinecone upsert requests
             
         Returns:
             Dictionary containing processing and storage results
@@ -31,30 +36,84 @@ class RAGPipeline:
         try:
             self.logger.info(f"Starting RAG pipeline for: {source_name}")
             
-            # Step 1: Process content into embeddings
-            self.logger.info("Step 1: Processing content and generating embeddings...")
-            processing_result = self.embedding_service.process_html_content(html_content, source_name)
+            # Step 1: Parse content
+            self.logger.info("Step 1: Parsing content...")
+            parsed_result = await asyncio.get_running_loop().run_in_executor(
+                None, self.embedding_service.parse_html_content, html_content
+            )
             
-            # Step 2: Store embeddings in vector database
-            self.logger.info("Step 2: Storing embeddings in Pinecone...")
-            storage_result = await self._store_embeddings(processing_result["chunks"], source_name)
+            return await self.process_and_store_parsed(
+                parsed_result, source_name, batch_size=batch_size, pool_threads=pool_threads
+            )
+            
+        except Exception as e:
+            self.logger.error(f"Error in RAG pipeline for {source_name}: {e}")
+            raise
+    
+    async def process_and_store_parsed(self, parsed_result: Dict[str, Any], source_name: str,
+                                       batch_size: int = 64,
+                                       pool_threads: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Embed and store content that has already been parsed
+        
+        Args:
+            parsed_result: Result of TextParser.parse_html_to_markdown, optionally
+                with the saved markdown path under "markdown_file"
+            source_name: Name of the source (used for metadata and identification)
+            batch_size: Chunks per embedding forward pass and per Pinecone upsert
+            pool_threads: Maximum concurrent Pinecone upsert requests
+            
+        Returns:
+            Dictionary containing processing and storage results
+        """
+        try:
+            loop = asyncio.get_running_loop()
+            
+            # Step 2: Embed text and images side by side; each branch is stored in
+            # Pinecone as soon as it is embedded, so the text upsert overlaps the
+            # (much slower) Gemini image analysis. The model's encode calls are
+            # serialized inside EmbeddingService
+            self.logger.info("Step 2: Generating embeddings and storing them in Pinecone...")
+            
+            async def embed_and_store(process_chunks):
+                chunks = await loop.run_in_executor(
+                    None, process_chunks, parsed_result, source_name, batch_size
+                )
+                storage = await self._store_embeddings(
+                    chunks, source_name, batch_size=batch_size, pool_threads=pool_threads
+                )
+                return chunks, storage
+            
+            (text_chunks, text_storage), (image_chunks, image_storage) = await asyncio.gather(
+                embed_and_store(self.embedding_service.process_text_chunks),
+                embed_and_store(self.embedding_service.process_image_chunks)
+            )
             
             # Step 3: Compile final results
+            total_chunks = len(text_chunks) + len(image_chunks)
+            successful_upserts = text_storage["successful_upserts"] + image_storage["successful_upserts"]
+            storage_result = {
+                "total_chunks": total_chunks,
+                "successful_upserts": successful_upserts,
+                "failed_upserts": total_chunks - successful_upserts,
+                "storage_timestamp": datetime.now().isoformat()
+            }
+            
             pipeline_result = {
                 "source": source_name,
                 "processing": {
-                    "total_chunks": processing_result["total_chunks"],
-                    "text_chunks": processing_result["text_chunks"],
-                    "image_chunks": processing_result["image_chunks"],
-                    "markdown_file": processing_result.get("markdown_file"),
-                    "processed_at": processing_result["processed_at"]
+                    "total_chunks": total_chunks,
+                    "text_chunks": len(text_chunks),
+                    "image_chunks": len(image_chunks),
+                    "markdown_file": parsed_result.get("markdown_file"),
+                    "processed_at": datetime.now().isoformat()
                 },
                 "storage": storage_result,
-                "success": storage_result["successful_upserts"] > 0
+                "success": successful_upserts > 0
             }
             
             self.logger.info(f"RAG pipeline completed for {source_name}: "
-                           f"{storage_result['successful_upserts']}/{processing_result['total_chunks']} chunks stored")
+                           f"{successful_upserts}/{total_chunks} chunks stored")
             
             return pipeline_result
             
@@ -62,7 +121,9 @@ class RAGPipeline:
             self.logger.error(f"Error in RAG pipeline for {source_name}: {e}")
             raise
     
-    async def _store_embeddings(self, chunks: List[Dict[str, Any]], source_name: str) -> Dict[str, Any]:
+    async def _store_embeddings(self, chunks: List[Dict[str, Any]], source_name: str,
+                                batch_size: int = 100,
+                                pool_threads: Optional[int] = None) -> Dict[str, Any]:
         """Store embedding chunks in Pinecone vector database"""
         try:
             # Prepare chunks for batch upsert
@@ -99,7 +160,9 @@ class RAGPipeline:
                 vector_chunks.append(vector_chunk)
             
             # Batch upsert to Pinecone
-            successful_upserts = await self.vector_store.upsert_batch(vector_chunks)
+            successful_upserts = await self.vector_store.upsert_batch(
+                vector_chunks, batch_size=batch_size, pool_threads=pool_threads
+            )
             
             result = {
                 "total_chunks": len(chunks),
@@ -152,6 +215,69 @@ class RAGPipeline:
             self.logger.error(f"Error searching similar content: {e}")
             return []
     
+    async def search_by_vectors(self, 
+                                query_embeddings: List[List[float]], 
+                                top_k: int = 5,
+                                content_type_filter: str = None) -> List[List[Dict[str, Any]]]:
+        """
+        Search for similar content for several pre-computed query embeddings
+        
+        Args:
+            query_embeddings: Query embeddings, e.g. from one batched embed_texts call
+            top_k: Number of results to return per query
+            content_type_filter: Filter by content type ("text" or "image")
+            
+        Returns:
+            List of similar-chunk lists, in the same order as query_embeddings
+        """
+        try:
+            filter_dict = None
+            if content_type_filter:
+                filter_dict = {"content_type": content_type_filter}
+            
+            # Queries are sent to the vector store concurrently
+            results = await self.vector_store.search_batch(
+                query_embeddings=query_embeddings,
+                top_k=top_k,
+                filter_dict=filter_dict
+            )
+            
+            self.logger.info(f"Completed {len(results)} vector searches")
+            return results
+            
+        except Exception as e:
+            self.logger.error(f"Error searching by vectors: {e}")
+            return [[] for _ in query_embeddings]
+    
+    async def search_many(self, 
+                          queries: List[str], 
+                          top_k: int = 5,
+                          content_type_filter: str = None) -> List[List[Dict[str, Any]]]:
+        """
+        Search for similar content for several query texts
+        
+        Args:
+            queries: Search query texts
+            top_k: Number of results to return per query
+            content_type_filter: Filter by content type ("text" or "image")
+            
+        Returns:
+            List of similar-chunk lists, in the same order as queries
+        """
+        try:
+            # Embed all queries in one batch, off the event loop
+            query_embeddings = await asyncio.get_running_loop().run_in_executor(
+                None, partial(self.embedding_service.text_embedding_service.embed_texts,
+                              queries, batch_size=len(queries), as_numpy=True)
+            )
+        except Exception as e:
+            self.logger.error(f"Error embedding queries: {e}")
+            return [[] for _ in queries]
+        
+        return await self.search_by_vectors(
+            query_embeddings, top_k=top_k, content_type_filter=content_type_filter
+        )
+    
     async def delete_source_content(self, source_name: str) -> bool:
         """Delete all content from a specific source"""
         try:
@@ -1,15 +1,55 @@
-from bs4 import BeautifulSoup, Tag
+from bs4 import BeautifulSoup
+import lxml.html
+from lxml import etree
 import re
 import logging
+import io
 import json
-from typing import Dict, List, Optional, Tuple
+import copy
+from functools import lru_cache
+from hashlib import blake2b
+from typing import Dict, List, Optional, Set, Tuple
 from datetime import datetime
+from pathlib import Path
 import os
+try:
+    # orjson serializes several times faster and emits UTF-8 bytes directly
+    import orjson
+except ImportError:
+    orjson = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Top-level keys every OpenAPI 3.x document must carry
+_REQUIRED_OPENAPI = frozenset(('openapi', 'info'))
+
+# Anchors that introduce an OpenAPI spec object literal in JavaScript
+_SPEC_ANCHOR_RE = re.compile(
+    r'(?:const|let|var)\s+openApiSpec\s*=\s*|openApiSpec\s*[:=]\s*|spec:\s*',
+    re.IGNORECASE
+)
+
+# Blank-line runs collapsed when cleaning the generated markdown and its
+# text-only copy
+_EXCESS_BLANK_RE = re.compile(r'\n{3,}')
+_BLANK_LINES_RE = re.compile(r'\n\s*\n')
+
+# Tags that produce markdown output, and the subset that are headings
+_HEADING_TAGS = frozenset(('h1', 'h2', 'h3', 'h4', 'h5', 'h6'))
+_MARKDOWN_TAGS = _HEADING_TAGS | {'p', 'ul', 'ol', 'strong', 'b'}
+
+# Pages are handed to lxml as UTF-8 bytes with the encoding fixed here, since
+# lxml rejects str input carrying an XML encoding declaration (XHTML pages)
+_UTF8_HTML_PARSER = lxml.html.HTMLParser(encoding='utf-8')
+
+# Output directories already created by this process
+_ENSURED_DIRS: Set[str] = set()
+
+# Number of parsed pages kept in memory, keyed by the raw HTML
+_PARSE_CACHE_SIZE = 32
+
 class TextParser:
     """Service for parsing website content and converting to markdown, with OpenAPI detection"""
     
@@ -28,26 +68,21 @@ class TextParser:
             Dictionary containing:
             - markdown_content: The generated markdown content
             - openapi_spec: Extracted OpenAPI specification (if found)
+            - image_refs: Unique images referenced in the markdown (alt_text, src_path, original_path)
+            - text_content: The markdown with image references removed
             - metadata: Information about the parsing
         """
         try:
-            # Parse HTML
-            soup = BeautifulSoup(html_content, 'html.parser')
-            
-            # Detect and extract OpenAPI specification
-            openapi_spec = self._extract_openapi_specification(soup, html_content)
-            
-            # Remove script, style, and other non-content elements for markdown processing
-            content_soup = BeautifulSoup(html_content, 'html.parser')
-            for element in content_soup(['script', 'style', 'nav', 'footer', 'meta', 'link']):
-                element.decompose()
-            
-            # Convert HTML to markdown
-            markdown_content = self._html_to_markdown(content_soup)
+            # Identical pages are only parsed once; mutable parts are copied so
+            # callers can't modify the cached entry
+            markdown_content, openapi_spec, image_refs, text_content = _parse_html_cached(html_content)
+            openapi_spec = copy.deepcopy(openapi_spec)
             
             result = {
                 "markdown_content": markdown_content,
                 "openapi_spec": openapi_spec,
+                "image_refs": copy.deepcopy(image_refs),
+                "text_content": text_content,
                 "metadata": {
                     "has_content": len(markdown_content.strip()) > 0,
                     "has_openapi": openapi_spec is not None,
@@ -61,6 +96,40 @@ class TextParser:
             self.logger.error(f"Error parsing HTML content: {e}")
             raise
     
+    def _parse_html(self, html_content: str) -> Tuple[str, Optional[Dict], List[Dict[str, str]], str]:
+        """
+        Run the full HTML parse: OpenAPI extraction plus markdown conversion
+        
+        Returns:
+            Tuple of (markdown_content, openapi_spec, image_refs, text_content)
+        """
+        # Parse HTML
+        soup = BeautifulSoup(html_content, 'html.parser')
+        
+        # Detect and extract OpenAPI specification
+        openapi_spec = self._extract_openapi_specification(soup, html_content)
+        
+        # The markdown conversion only needs tag names, text and attributes,
+        # so it works on the lxml tree directly rather than through bs4
+        markdown_content, image_refs, text_content = "", [], ""
+        if html_content.strip():
+            try:
+                content_root = lxml.html.document_fromstring(
+                    html_content.encode('utf-8'), parser=_UTF8_HTML_PARSER
+                )
+            except etree.ParserError:
+                # Nothing but comments/whitespace: no content to convert
+                return markdown_content, openapi_spec, image_refs, text_content
+            
+            # Remove script, style, and other non-content elements for markdown processing
+            for element in list(content_root.iter('script', 'style', 'nav', 'footer', 'meta', 'link')):
+                element.drop_tree()
+            
+            # Convert HTML to markdown
+            markdown_content, image_refs, text_content = self._html_to_markdown_lxml(content_root)
+        
+        return markdown_content, openapi_spec, image_refs, text_content
+    
     def _extract_openapi_specification(self, soup: BeautifulSoup, html_content: str) -> Optional[Dict]:
         """
         Dynamically detect and extract OpenAPI specification from HTML content
@@ -112,6 +181,10 @@ class TextParser:
         """
         indicators = []
         
+        # All literal indicators are ASCII, so scan a UTF-8 byte view of the
+        # page once encoded; bytes substring search is faster than str search
+        html_bytes = html_content.encode('utf-8', 'ignore')
+        
         # Check for Swagger UI script references
         swagger_scripts = [
             'swagger-ui-bundle',
@@ -122,11 +195,11 @@ class TextParser:
         ]
         
         for script_name in swagger_scripts:
-            if script_name in html_content:
+            if script_name.encode('ascii') in html_bytes:
                 indicators.append(f"script:{script_name}")
         
         # Check for CSS references
-        if 'swagger-ui.css' in html_content or 'swagger-ui-dist' in html_content:
+        if b'swagger-ui.css' in html_bytes or b'swagger-ui-dist' in html_bytes:
             indicators.append("css:swagger-ui")
         
         # Check for DOM elements that might contain Swagger UI
@@ -229,48 +302,43 @@ class TextParser:
         """
         Extract OpenAPI spec using balanced brace matching for complex nested objects
         """
-        # Look for openApiSpec variable assignment
-        spec_patterns = [
-            r'(?:const|let|var)\s+openApiSpec\s*=\s*',
-            r'openApiSpec\s*[:\=]\s*',
-            r'spec:\s*'
-        ]
+        # Find every spec assignment anchor in one pass; several anchors often
+        # point at the same object, so each opening brace is scanned only once
+        scanned_offsets = set()
         
-        for pattern in spec_patterns:
-            match = re.search(pattern, js_content, re.IGNORECASE)
-            if match:
-                start_pos = match.end()
-                
-                # Find the opening brace
-                while start_pos < len(js_content) and js_content[start_pos] != '{':
-                    start_pos += 1
-                
-                if start_pos >= len(js_content):
-                    continue
-                
-                # Extract the complete object using balanced brace counting
-                obj_str = self._extract_balanced_object(js_content, start_pos)
-                if obj_str:
+        for match in _SPEC_ANCHOR_RE.finditer(js_content):
+            # Find the opening brace
+            start_pos = js_content.find('{', match.end())
+            if start_pos == -1:
+                break
+            
+            if start_pos in scanned_offsets:
+                continue
+            scanned_offsets.add(start_pos)
+            
+            # Extract the complete object using balanced brace counting
+            obj_str = self._extract_balanced_object(js_content, start_pos)
+            if obj_str:
+                try:
+                    # Try to convert JS object to valid JSON
+                    json_str = self._js_to_json(obj_str)
+                    spec_obj = json.loads(json_str)
+                    
+                    if self._is_valid_openapi_spec(spec_obj):
+                        return spec_obj
+                except (json.JSONDecodeError, ValueError) as e:
+                    self.logger.debug(f"Failed to parse extracted object: {e}")
+                    # Try ultra-aggressive cleanup as fallback
                     try:
-                        # Try to convert JS object to valid JSON
-                        json_str = self._js_to_json(obj_str)
-                        spec_obj = json.loads(json_str)
+                        ultra_cleaned = self._ultra_aggressive_cleanup(obj_str)
+                        spec_obj = json.loads(ultra_cleaned)
                         
                         if self._is_valid_openapi_spec(spec_obj):
+                            self.logger.info("Successfully parsed OpenAPI spec with ultra-aggressive cleanup")
                             return spec_obj
-                    except (json.JSONDecodeError, ValueError) as e:
-                        self.logger.debug(f"Failed to parse extracted object: {e}")
-                        # Try ultra-aggressive cleanup as fallback
-                        try:
-                            ultra_cleaned = self._ultra_aggressive_cleanup(obj_str)
-                            spec_obj = json.loads(ultra_cleaned)
-                            
-                            if self._is_valid_openapi_spec(spec_obj):
-                                self.logger.info("Successfully parsed OpenAPI spec with ultra-aggressive cleanup")
-                                return spec_obj
-                        except (json.JSONDecodeError, ValueError) as e2:
-                            self.logger.debug(f"Ultra-aggressive cleanup also failed: {e2}")
-                        continue
+                    except (json.JSONDecodeError, ValueError) as e2:
+                        self.logger.debug(f"Ultra-aggressive cleanup also failed: {e2}")
+                    continue
         
         return None
     
@@ -585,8 +653,7 @@ class TextParser:
             return False
         
         # Check for required OpenAPI fields
-        required_fields = ['openapi', 'info']
-        if not all(field in spec_obj for field in required_fields):
+        if not _REQUIRED_OPENAPI <= spec_obj.keys():
             # Check for Swagger 2.0
             if 'swagger' in spec_obj and 'info' in spec_obj:
                 return True
@@ -621,70 +688,107 @@ class TextParser:
         
         return None
     
-    def _html_to_markdown(self, soup: BeautifulSoup) -> str:
-        """Convert HTML content to markdown format"""
-        markdown_lines = []
+    def _html_to_markdown_lxml(self, root: lxml.html.HtmlElement) -> Tuple[str, List[Dict[str, str]], str]:
+        """
+        Convert an lxml HTML tree to markdown format
+        
+        Image references and the text-only content are collected during the
+        same walk, so nothing downstream has to re-scan the markdown.
         
-        # Process all elements in order
-        for element in soup.find('body').descendants if soup.find('body') else soup.descendants:
-            if not isinstance(element, Tag):
+        Returns:
+            Tuple of (markdown_content, image_refs, text_content)
+        """
+        markdown_lines = []
+        image_lines = {}
+        
+        # Walk the tree once in document order, tracking how many heading,
+        # list item and paragraph ancestors are currently open
+        body = root.find('body')
+        heading_depth = 0
+        li_depth = 0
+        p_depth = 0
+        
+        for event, element in etree.iterwalk(body if body is not None else root, events=('start', 'end')):
+            tag = element.tag
+            if not isinstance(tag, str):
                 continue
             
-            # Handle images first (before text check)
-            if element.name == 'img':
-                print("img element: ", element)
-                src = element.get('src', '')
-                alt = element.get('alt', '')
-                if src:
-                    # Adjust image path for markdown location
-                    adjusted_src = self._adjust_image_path(src)
-                    markdown_lines.append(f"![{alt}]({adjusted_src})\n")
-                continue  # Skip to next element
-            
-            # Skip if element is empty (for text elements)
-            text = element.get_text(strip=True)
-            if not text:
+            if event == 'end':
+                if tag in _HEADING_TAGS:
+                    heading_depth -= 1
+                elif tag == 'li':
+                    li_depth -= 1
+                elif tag == 'p':
+                    p_depth -= 1
                 continue
             
-            # Handle different HTML elements
-            if element.name == 'h1':
-                markdown_lines.append(f"# {text}\n")
-            elif element.name == 'h2':
-                markdown_lines.append(f"## {text}\n")
-            elif element.name == 'h3':
-                markdown_lines.append(f"### {text}\n")
-            elif element.name == 'h4':
-                markdown_lines.append(f"#### {text}\n")
-            elif element.name == 'h5':
-                markdown_lines.append(f"##### {text}\n")
-            elif element.name == 'h6':
-                markdown_lines.append(f"###### {text}\n")
-            elif element.name == 'p':
-                # Only add if it's a direct paragraph, not nested
-                if not any(ancestor.name in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'li'] for ancestor in element.parents):
-                    markdown_lines.append(f"{text}\n")
-            elif element.name == 'ul':
-                # Process list items
-                for li in element.find_all('li', recursive=False):
-                    li_text = li.get_text(strip=True)
-                    if li_text:
-                        markdown_lines.append(f"- {li_text}")
-                markdown_lines.append("")  # Empty line after list
-            elif element.name == 'ol':
-                # Process ordered list items
-                for i, li in enumerate(element.find_all('li', recursive=False), 1):
-                    li_text = li.get_text(strip=True)
-                    if li_text:
-                        markdown_lines.append(f"{i}. {li_text}")
-                markdown_lines.append("")  # Empty line after list
-            elif element.name == 'strong' or element.name == 'b':
-                # Bold text - only if it's not already processed by parent
-                if not any(ancestor.name in ['p', 'li', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'] for ancestor in element.parents):
-                    markdown_lines.append(f"**{text}**\n")
+            self._element_to_markdown(element, markdown_lines, image_lines, heading_depth, li_depth, p_depth)
+            
+            if tag in _HEADING_TAGS:
+                heading_depth += 1
+            elif tag == 'li':
+                li_depth += 1
+            elif tag == 'p':
+                p_depth += 1
         
         # Clean up the markdown content
-        cleaned_markdown = self._clean_markdown(markdown_lines)
-        return cleaned_markdown
+        return self._clean_markdown(markdown_lines, image_lines)
+    
+    def _element_to_markdown(self, element: lxml.html.HtmlElement, markdown_lines: List[str],
+                             image_lines: Dict[str, Dict[str, str]],
+                             heading_depth: int, li_depth: int, p_depth: int):
+        """Append the markdown for a single element given its open ancestors"""
+        tag = element.tag
+        
+        # Handle images first (before text check)
+        if tag == 'img':
+            src = element.get('src', '')
+            alt = element.get('alt', '')
+            if src:
+                # Adjust image path for markdown location
+                adjusted_src = self._adjust_image_path(src)
+                image_line = f"![{alt}]({adjusted_src})"
+                markdown_lines.append(f"{image_line}\n")
+                image_lines[image_line] = {
+                    "alt_text": alt,
+                    "src_path": adjusted_src,
+                    "original_path": adjusted_src
+                }
+            return
+        
+        if tag not in _MARKDOWN_TAGS:
+            return
+        
+        # Skip if element is empty (for text elements)
+        text = _element_text(element)
+        if not text:
+            return
+        
+        # Handle different HTML elements
+        if tag in _HEADING_TAGS:
+            markdown_lines.append(f"{'#' * int(tag[1])} {text}\n")
+        elif tag == 'p':
+            # Only add if it's a direct paragraph, not nested
+            if not (heading_depth or li_depth):
+                markdown_lines.append(f"{text}\n")
+        elif tag == 'ul':
+            # Process list items
+            for li in element.findall('li'):
+                li_text = _element_text(li)
+                if li_text:
+                    markdown_lines.append(f"- {li_text}")
+            markdown_lines.append("")  # Empty line after list
+        elif tag == 'ol':
+            # Process ordered list items
+            for i, li in enumerate(element.findall('li'), 1):
+                li_text = _element_text(li)
+                if li_text:
+                    markdown_lines.append(f"{i}. {li_text}")
+            markdown_lines.append("")  # Empty line after list
+        elif tag in ('strong', 'b'):
+            # Bold text - only if it's not already processed by parent
+            if not (heading_depth or li_depth or p_depth):
+                markdown_lines.append(f"**{text}**\n")
     
     def _adjust_image_path(self, src: str) -> str:
         """
@@ -722,38 +826,76 @@ class TextParser:
         
         return src
     
-    def _clean_markdown(self, markdown_lines: List[str]) -> str:
-        """Clean up markdown content by removing duplicates and formatting"""
+    def _clean_markdown(self, markdown_lines: List[str],
+                        image_lines: Optional[Dict[str, Dict[str, str]]] = None) -> Tuple[str, List[Dict[str, str]], str]:
+        """
+        Clean up markdown content by removing duplicates and formatting
+        
+        Args:
+            markdown_lines: Raw markdown lines in document order
+            image_lines: Image reference for each markdown image line
+            
+        Returns:
+            Tuple of (markdown_content, image_refs, text_content), where the
+            image refs are unique by source path and the text content is the
+            markdown with the image lines left out
+        """
         if not markdown_lines:
-            return ""
+            return "", [], ""
         
-        cleaned_lines = []
+        image_lines = image_lines or {}
+        image_refs = []
+        seen_srcs = set()
+        out = io.StringIO()
+        text_out = io.StringIO()
         seen_content = set()
+        add_seen = seen_content.add
+        last_blank = True  # Suppresses leading blank lines
         
         for line in markdown_lines:
-            # Skip empty lines and whitespace
-            if not line.strip():
-                if cleaned_lines and cleaned_lines[-1] != "":
-                    cleaned_lines.append("")
+            stripped = line.strip()
+            
+            # Collapse runs of empty lines into a single blank line
+            if not stripped:
+                if not last_blank:
+                    out.write('\n')
+                    text_out.write('\n')
+                    last_blank = True
                 continue
             
-            # Normalize content for duplicate detection
-            normalized = re.sub(r'\s+', ' ', line.strip().lower())
+            # Normalize content for duplicate detection; only a short digest
+            # is kept so the seen set doesn't pin every line of the page
+            normalized = ' '.join(stripped.lower().split())
+            key = blake2b(normalized.encode('utf-8'), digest_size=8).digest()
             
             # Skip duplicate content
-            if normalized in seen_content:
+            if key in seen_content:
                 continue
             
-            seen_content.add(normalized)
-            cleaned_lines.append(line.strip())
+            add_seen(key)
+            out.write(stripped)
+            out.write('\n')
+            last_blank = False
+            
+            # Image lines become blank lines in the text-only copy
+            # Only the first reference to each image is kept, so repeated
+            # logos and icons are analyzed once
+            image_ref = image_lines.get(stripped)
+            if image_ref:
+                if image_ref["src_path"] not in seen_srcs:
+                    seen_srcs.add(image_ref["src_path"])
+                    image_refs.append(image_ref)
+            else:
+                text_out.write(stripped)
+            text_out.write('\n')
         
-        # Join lines and clean up extra whitespace
-        markdown_content = '\n'.join(cleaned_lines)
+        markdown_content = out.getvalue()
         
         # Remove excessive blank lines
-        markdown_content = re.sub(r'\n{3,}', '\n\n', markdown_content)
+        markdown_content = _EXCESS_BLANK_RE.sub('\n\n', markdown_content)
+        text_content = _BLANK_LINES_RE.sub('\n\n', text_out.getvalue())
         
-        return markdown_content.strip()
+        return markdown_content.strip(), image_refs, text_content.strip()
     
     def save_markdown_file(self, markdown_content: str, output_dir: str = "docs") -> str:
         """
@@ -767,16 +909,15 @@ class TextParser:
             Path to the saved file
         """
         # Create output directory if it doesn't exist
-        os.makedirs(output_dir, exist_ok=True)
+        _ensure_dir(output_dir)
         
         # Generate filename with timestamp
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"website_content_{timestamp}.md"
         filepath = os.path.join(output_dir, filename)
         
-        # Save content
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(markdown_content)
+        # Save content in a single write
+        Path(filepath).write_text(markdown_content, encoding='utf-8')
         
         self.logger.info(f"Saved markdown file: {filepath}")
         self.logger.info(f"Image paths in markdown are relative to: {os.path.abspath(output_dir)}")
@@ -794,16 +935,39 @@ class TextParser:
             Path to the saved file
         """
         # Create output directory if it doesn't exist
-        os.makedirs(output_dir, exist_ok=True)
+        _ensure_dir(output_dir)
         
         # Generate filename with timestamp
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"openapi_spec_{timestamp}.json"
         filepath = os.path.join(output_dir, filename)
         
-        # Save content
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(openapi_spec, f, indent=2, ensure_ascii=False)
+        # Serialize once and save content in a single write
+        if orjson is not None:
+            data = orjson.dumps(openapi_spec, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        else:
+            data = json.dumps(openapi_spec, indent=2, ensure_ascii=False).encode('utf-8')
+        Path(filepath).write_bytes(data)
         
         self.logger.info(f"Saved OpenAPI specification: {filepath}")
-        return filepath 
\ No newline at end of file
+        return filepath
+
+
+def _ensure_dir(output_dir: str):
+    """Create output_dir once per process instead of on every save"""
+    # Keyed by absolute path so a change of working directory isn't missed
+    abs_dir = os.path.abspath(output_dir)
+    if abs_dir not in _ENSURED_DIRS:
+        os.makedirs(abs_dir, exist_ok=True)
+        _ENSURED_DIRS.add(abs_dir)
+
+
+def _element_text(element: lxml.html.HtmlElement) -> str:
+    """Stripped text of an element, matching bs4's get_text(strip=True)"""
+    return ''.join(text.strip() for text in element.itertext())
+
+
+@lru_cache(maxsize=_PARSE_CACHE_SIZE)
+def _parse_html_cached(html_content: str) -> Tuple[str, Optional[Dict], List[Dict[str, str]], str]:
+    """Parse HTML once per distinct page content"""
+    return TextParser()._parse_html(html_content)
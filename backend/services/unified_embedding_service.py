@@ -1,12 +1,14 @@
 import os
-import re
+import io
+import sqlite3
+import threading
+from collections import OrderedDict
+from hashlib import blake2b
 from typing import List, Dict, Any, Optional
 import logging
 from datetime import datetime
 import base64
-import requests
-from PIL import Image
-import google.generativeai as genai
+from concurrent.futures import ThreadPoolExecutor
 import dotenv
 
 dotenv.load_dotenv()
@@ -19,6 +21,46 @@ from .text_parser import TextParser
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of concurrent Gemini image analysis requests
+GEMINI_MAX_WORKERS = 8
+
+# Number of Gemini image descriptions kept in memory, keyed by the disk cache digest
+GEMINI_CACHE_SIZE = 32
+
+# Persistent Gemini description cache, pruned oldest-first past the entry limit
+GEMINI_DISK_CACHE_DIR = os.getenv("GEMINI_CACHE_DIR", os.path.join("docs", ".gemini_cache"))
+GEMINI_DISK_CACHE_MAX_ENTRIES = 1000
+
+# Prompt used to describe business process diagrams; {ctx} is the image alt text
+_GEMINI_PROMPT_TMPL = """Analyze this image in detail. This appears to be a business process diagram or workflow.
+
+Context: {ctx}
+
+Please provide a comprehensive analysis including:
+
+1. **Diagram Type**: What type of diagram is this (flowchart, swim lane, process flow, etc.)?
+
+2. **Process Overview**: What business process or workflow does this represent?
+
+3. **Key Components**:
+   - What are the main steps or stages?
+   - What are the decision points?
+   - What are the different roles/actors involved?
+
+4. **Process Flow**: Describe the sequence of activities from start to end.
+
+5. **Business Logic**: What business rules or conditions are represented?
+
+6. **Stakeholders**: Who are the different parties involved in this process?
+
+Please be detailed and specific, as this information will be used to answer user questions about the business process."""
+
+# Identifies the prompt template in cache keys, so editing it invalidates old entries
+_GEMINI_PROMPT_VERSION = blake2b(_GEMINI_PROMPT_TMPL.encode('utf-8'), digest_size=8).digest()
+
+# Leading bytes of every JPEG file
+_JPEG_MAGIC = b'\xff\xd8\xff'
+
 class UnifiedEmbeddingService:
     """Unified service for processing text and images into embeddings for RAG pipeline"""
     
@@ -32,6 +74,11 @@ class UnifiedEmbeddingService:
         # Initialize Gemini for image processing
         self.gemini_model = None
         self._initialize_gemini()
+        
+        # The same diagram is often embedded on several pages; analyzed from
+        # several worker threads, so the LRU is guarded by a lock
+        self._descriptions = OrderedDict()
+        self._descriptions_lock = threading.Lock()
     
     def _initialize_gemini(self):
         """Initialize Google Gemini for image processing"""
@@ -41,6 +88,9 @@ class UnifiedEmbeddingService:
                 self.logger.warning("GOOGLE_API_KEY not found. Image processing will be skipped.")
                 return
             
+            # Imported here so text-only callers don't pay for the Gemini SDK
+            import google.generativeai as genai
+            
             genai.configure(api_key=api_key)
             self.gemini_model = genai.GenerativeModel('gemini-1.5-flash')
             self.logger.info("Gemini model initialized for image processing")
@@ -49,13 +99,15 @@ class UnifiedEmbeddingService:
             self.logger.error(f"Error initializing Gemini: {e}")
             self.gemini_model = None
     
-    def process_html_content(self, html_content: str, source_name: str = "webpage") -> Dict[str, Any]:
+    def process_html_content(self, html_content: str, source_name: str = "webpage",
+                             batch_size: int = 64) -> Dict[str, Any]:
         """
         Process HTML content and extract both text and images for embedding
         
         Args:
             html_content: HTML content to process
             source_name: Name of the source (for metadata)
+            batch_size: Number of chunks encoded per embedding forward pass
             
         Returns:
             Dictionary containing processed embeddings and metadata
@@ -63,30 +115,16 @@ class UnifiedEmbeddingService:
         try:
             self.logger.info(f"Processing HTML content from: {source_name}")
             
-            # Step 1: Parse HTML to markdown
-            parsed_result = self.text_parser.parse_html_to_markdown(html_content)
+            # Step 1: Parse HTML to markdown and save it
+            parsed_result = self.parse_html_content(html_content)
             markdown_content = parsed_result["markdown_content"]
+            markdown_filepath = parsed_result["markdown_file"]
             
-            # Step 1.5: Save markdown file for reference
-            try:
-                markdown_filepath = self.text_parser.save_markdown_file(markdown_content)
-                self.logger.info(f"Saved markdown file: {markdown_filepath}")
-            except Exception as e:
-                self.logger.warning(f"Could not save markdown file: {e}")
-                markdown_filepath = None
-            
-            # Step 2: Extract image references from markdown
-            image_refs = self._extract_image_references(markdown_content)
+            # Step 2: Process text chunks
+            text_chunks = self.process_text_chunks(parsed_result, source_name, batch_size)
             
-            # Step 3: Process text chunks
-            text_chunks = self._process_text_content(markdown_content, source_name)
-            
-            # Step 4: Process images if any
-            image_chunks = []
-            if image_refs and self.gemini_model:
-                image_chunks = self._process_image_content(image_refs, source_name)
-            elif image_refs and not self.gemini_model:
-                self.logger.warning("Images found but Gemini not available. Skipping image processing.")
+            # Step 3: Process images if any
+            image_chunks = self.process_image_chunks(parsed_result, source_name, batch_size)
             
             # Combine results
             all_chunks = text_chunks + image_chunks
@@ -109,68 +147,92 @@ class UnifiedEmbeddingService:
             self.logger.error(f"Error processing HTML content: {e}")
             raise
     
-    def _extract_image_references(self, markdown_content: str) -> List[Dict[str, str]]:
-        """Extract image references from markdown content"""
-        image_refs = []
+    def parse_html_content(self, html_content: str) -> Dict[str, Any]:
+        """
+        Parse HTML to markdown and save the markdown file for reference
+        
+        Returns:
+            The parser result with the saved path added as "markdown_file"
+            (None if the file could not be saved)
+        """
+        parsed_result = self.text_parser.parse_html_to_markdown(html_content)
+        
+        try:
+            markdown_filepath = self.text_parser.save_markdown_file(parsed_result["markdown_content"])
+            self.logger.info(f"Saved markdown file: {markdown_filepath}")
+        except Exception as e:
+            self.logger.warning(f"Could not save markdown file: {e}")
+            markdown_filepath = None
         
-        # Pattern to match markdown images: ![alt](src)
-        image_pattern = r'!\[([^\]]*)\]\(([^)]+)\)'
-        matches = re.findall(image_pattern, markdown_content)
+        parsed_result["markdown_file"] = markdown_filepath
         
-        for alt_text, src_path in matches:
-            image_refs.append({
-                "alt_text": alt_text,
-                "src_path": src_path,
-                "original_path": src_path
-            })
+        # Image references were collected while parsing
+        self.logger.info(f"Found {len(parsed_result['image_refs'])} image references")
+        return parsed_result
+    
+    def process_text_chunks(self, parsed_result: Dict[str, Any], source_name: str,
+                            batch_size: int = 64) -> List[Dict[str, Any]]:
+        """Chunk and embed the text of a parsed page"""
+        return self._process_text_content(parsed_result["text_content"], source_name, batch_size)
+    
+    def process_image_chunks(self, parsed_result: Dict[str, Any], source_name: str,
+                             batch_size: int = 64) -> List[Dict[str, Any]]:
+        """Describe and embed the images of a parsed page (empty if Gemini is unavailable)"""
+        image_refs = parsed_result["image_refs"]
+        if not image_refs:
+            return []
+        
+        if not self.gemini_model:
+            self.logger.warning("Images found but Gemini not available. Skipping image processing.")
+            return []
         
-        self.logger.info(f"Found {len(image_refs)} image references")
-        return image_refs
+        return self._process_image_content(image_refs, source_name, batch_size)
     
-    def _process_text_content(self, markdown_content: str, source_name: str) -> List[Dict[str, Any]]:
-        """Process text content into embedded chunks"""
+    def _process_text_content(self, text_only: str, source_name: str, batch_size: int = 64) -> List[Dict[str, Any]]:
+        """Process text content (markdown without image references) into embedded chunks"""
         try:
-            # Remove image markdown syntax for text processing
-            text_only = re.sub(r'!\[([^\]]*)\]\(([^)]+)\)', '', markdown_content)
-            text_only = re.sub(r'\n\s*\n', '\n\n', text_only).strip()
-            
             self.logger.debug(f"Text content for chunking: {text_only[:200]}...")
             
-            # Temporarily enable debug logging for chunking
-            original_level = self.chunking_service.logger.level
-            self.chunking_service.logger.setLevel(logging.DEBUG)
+            # Surface chunking debug output only when this service is debugging;
+            # setLevel invalidates the logger cache, so it isn't toggled per call
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.chunking_service.logger.setLevel(logging.DEBUG)
             
             # Chunk the text
             text_chunks = self.chunking_service.chunk_text(text_only, source_name, "general")
             
-            # Restore original logging level
-            self.chunking_service.logger.setLevel(original_level)
-            
             self.logger.info(f"Generated {len(text_chunks)} text chunks from content")
-            # Generate embeddings for text chunks
-            embedded_chunks = []
+            # Drop empty chunks up front so the batch stays aligned with text_chunks
+            valid_chunks = []
             for chunk in text_chunks:
-                try:
-                    embedding = self.text_embedding_service.embed_text(chunk["content"])
-                    
-                    embedded_chunk = {
-                        "id": chunk["chunk_id"],  # Fixed: use chunk_id instead of id
-                        "content": chunk["content"],
-                        "embedding": embedding,
-                        "metadata": {
-                            "content_type": "text",
-                            "source": source_name,
-                            "chunk_type": chunk.get("chunk_type", "general"),
-                            "chunk_index": chunk.get("chunk_index", 0),
-                            "content_length": chunk.get("content_length", len(chunk["content"])),
-                            "word_count": chunk.get("word_count", len(chunk["content"].split()))
-                        }
+                if chunk["content"] and chunk["content"].strip():
+                    valid_chunks.append(chunk)
+                else:
+                    self.logger.error(f"Error embedding text chunk {chunk['chunk_id']}: Text cannot be empty")
+            
+            # Generate embeddings for all text chunks in a single batched call
+            embeddings = self.text_embedding_service.embed_texts(
+                [chunk["content"] for chunk in valid_chunks], batch_size=batch_size, as_numpy=True
+            )
+            
+            # Chunks from the chunking service already carry their lengths, so the
+            # fallbacks are only computed when a count is missing
+            embedded_chunks = [
+                {
+                    "id": chunk["chunk_id"],  # Fixed: use chunk_id instead of id
+                    "content": chunk["content"],
+                    "embedding": embedding,
+                    "metadata": {
+                        "content_type": "text",
+                        "source": source_name,
+                        "chunk_type": chunk.get("chunk_type", "general"),
+                        "chunk_index": chunk.get("chunk_index", 0),
+                        "content_length": chunk.get("content_length") or len(chunk["content"]),
+                        "word_count": chunk.get("word_count") or len(chunk["content"].split())
                     }
-                    embedded_chunks.append(embedded_chunk)
-                    
-                except Exception as e:
-                    self.logger.error(f"Error embedding text chunk {chunk['chunk_id']}: {e}")
-                    continue
+                }
+                for chunk, embedding in zip(valid_chunks, embeddings)
+            ]
             
             self.logger.info(f"Successfully embedded {len(embedded_chunks)} text chunks")
             return embedded_chunks
@@ -179,58 +241,84 @@ class UnifiedEmbeddingService:
             self.logger.error(f"Error processing text content: {e}")
             return []
     
-    def _process_image_content(self, image_refs: List[Dict[str, str]], source_name: str) -> List[Dict[str, Any]]:
+    def _process_image_content(self, image_refs: List[Dict[str, str]], source_name: str,
+                               batch_size: int = 64) -> List[Dict[str, Any]]:
         """Process images using Gemini and create embedded chunks"""
-        image_chunks = []
+        # Different src spellings can point at the same file; analyze each file once
+        unique_images = {}
+        for image_ref in image_refs:
+            unique_images.setdefault(self._resolve_image_path(image_ref["src_path"]), image_ref)
         
-        for i, image_ref in enumerate(image_refs):
-            try:
-                # Resolve image path
-                image_path = self._resolve_image_path(image_ref["src_path"])
-                
-                if not os.path.exists(image_path):
-                    self.logger.warning(f"Image file not found: {image_path}")
-                    continue
-                
-                # Process image with Gemini
-                image_description = self._analyze_image_with_gemini(image_path, image_ref["alt_text"])
-                
-                if not image_description:
-                    self.logger.warning(f"Failed to process image: {image_path}")
-                    continue
-                
-                # Create comprehensive content for embedding
-                image_content = self._create_image_content_for_embedding(image_ref, image_description)
-                
-                # Generate embedding for image content
-                embedding = self.text_embedding_service.embed_text(image_content)
-                
-                # Create image chunk
-                chunk_id = f"{source_name}_image_{i+1}"
-                image_chunk = {
-                    "id": chunk_id,
-                    "content": image_content,
-                    "embedding": embedding,
-                    "metadata": {
-                        "content_type": "image",
-                        "source": source_name,
-                        "image_path": image_path,
-                        "alt_text": image_ref["alt_text"],
-                        "original_src": image_ref["original_path"],
-                        "gemini_description": image_description,
-                        "processed_at": datetime.now().isoformat()
-                    }
-                }
-                
-                image_chunks.append(image_chunk)
-                self.logger.info(f"Successfully processed image: {image_path}")
-                
-            except Exception as e:
-                self.logger.error(f"Error processing image {image_ref['src_path']}: {e}")
-                continue
+        if len(unique_images) < len(image_refs):
+            self.logger.info(f"Analyzing {len(unique_images)} unique images out of {len(image_refs)} references")
+        
+        # Gemini calls are network-bound, so analyze the images concurrently
+        with ThreadPoolExecutor(max_workers=GEMINI_MAX_WORKERS) as executor:
+            results = executor.map(
+                lambda item: self._process_single_image(item[0], item[1][0], item[1][1], source_name),
+                enumerate(unique_images.items())
+            )
+            image_chunks = [chunk for chunk in results if chunk]
+        
+        if not image_chunks:
+            return []
+        
+        # Generate embeddings for all image descriptions in a single batched call
+        try:
+            embeddings = self.text_embedding_service.embed_texts(
+                [chunk["content"] for chunk in image_chunks], batch_size=batch_size, as_numpy=True
+            )
+        except Exception as e:
+            self.logger.error(f"Error embedding image chunks: {e}")
+            return []
+        
+        for chunk, embedding in zip(image_chunks, embeddings):
+            chunk["embedding"] = embedding
         
         return image_chunks
     
+    def _process_single_image(self, i: int, image_path: str, image_ref: Dict[str, str],
+                              source_name: str) -> Optional[Dict[str, Any]]:
+        """Analyze one resolved image with Gemini and build its (not yet embedded) chunk"""
+        try:
+            if not os.path.exists(image_path):
+                self.logger.warning(f"Image file not found: {image_path}")
+                return None
+            
+            # Process image with Gemini
+            image_description = self._analyze_image_with_gemini(image_path, image_ref["alt_text"])
+            
+            if not image_description:
+                self.logger.warning(f"Failed to process image: {image_path}")
+                return None
+            
+            # Create comprehensive content for embedding
+            image_content = self._create_image_content_for_embedding(image_ref, image_description)
+            
+            # Create image chunk
+            chunk_id = f"{source_name}_image_{i+1}"
+            image_chunk = {
+                "id": chunk_id,
+                "content": image_content,
+                "embedding": None,
+                "metadata": {
+                    "content_type": "image",
+                    "source": source_name,
+                    "image_path": image_path,
+                    "alt_text": image_ref["alt_text"],
+                    "original_src": image_ref["original_path"],
+                    "gemini_description": image_description,
+                    "processed_at": datetime.now().isoformat()
+                }
+            }
+            
+            self.logger.info(f"Successfully processed image: {image_path}")
+            return image_chunk
+            
+        except Exception as e:
+            self.logger.error(f"Error processing image {image_ref['src_path']}: {e}")
+            return None
+    
     def _resolve_image_path(self, src_path: str) -> str:
         """Resolve image path relative to current working directory"""
         # Remove ../ if present and adjust for current working directory
@@ -252,40 +340,19 @@ class UnifiedEmbeddingService:
             if not self.gemini_model:
                 return None
             
-            # Load and prepare image
-            image = Image.open(image_path)
-            
-            # Create detailed prompt for business process diagrams
-            prompt = f"""
-            Analyze this image in detail. This appears to be a business process diagram or workflow.
-            
-            Context: {alt_text if alt_text else "Business process diagram"}
+            # Cache lookups use the file as stored on disk; it is only converted
+            # for Gemini when the description has to be generated
+            with open(image_path, 'rb') as f:
+                image_data = f.read()
             
-            Please provide a comprehensive analysis including:
-            
-            1. **Diagram Type**: What type of diagram is this (flowchart, swim lane, process flow, etc.)?
-            
-            2. **Process Overview**: What business process or workflow does this represent?
-            
-            3. **Key Components**: 
-               - What are the main steps or stages?
-               - What are the decision points?
-               - What are the different roles/actors involved?
-            
-            4. **Process Flow**: Describe the sequence of activities from start to end.
-            
-            5. **Business Logic**: What business rules or conditions are represented?
-            
-            6. **Stakeholders**: Who are the different parties involved in this process?
-            
-            Please be detailed and specific, as this information will be used to answer user questions about the business process.
-            """
+            # The alt text is the context filled into the shared prompt template
+            context = alt_text if alt_text else "Business process diagram"
             
             # Generate response
-            response = self.gemini_model.generate_content([prompt, image])
+            description = self._describe_image(image_data, context)
             
-            if response and response.text:
-                return response.text.strip()
+            if description:
+                return description
             else:
                 self.logger.warning("Gemini returned empty response for image")
                 return None
@@ -294,6 +361,91 @@ class UnifiedEmbeddingService:
             self.logger.error(f"Error analyzing image with Gemini: {e}")
             return None
     
+    def _encode_image_for_gemini(self, image_data: bytes) -> bytes:
+        """Return image file bytes as JPEG, re-encoding only when it isn't JPEG already"""
+        if image_data.startswith(_JPEG_MAGIC):
+            return image_data
+        
+        from PIL import Image
+        
+        buffer = io.BytesIO()
+        Image.open(io.BytesIO(image_data)).convert('RGB').save(buffer, 'JPEG', quality=85)
+        return buffer.getvalue()
+    
+    def _describe_image(self, image_data: bytes, context: str) -> Optional[str]:
+        """Return the Gemini description for raw image file bytes, consulting the memory cache first"""
+        cache_key = blake2b(image_data + _GEMINI_PROMPT_VERSION + context.encode('utf-8'), digest_size=16).digest()
+        
+        with self._descriptions_lock:
+            description = self._descriptions.get(cache_key)
+            if description is not None:
+                self._descriptions.move_to_end(cache_key)
+                return description
+        
+        # Empty or blocked responses aren't cached so the image is retried next time
+        description = self._describe_image_uncached(image_data, context, cache_key)
+        if description:
+            with self._descriptions_lock:
+                self._descriptions[cache_key] = description
+                if len(self._descriptions) > GEMINI_CACHE_SIZE:
+                    self._descriptions.popitem(last=False)
+        return description
+    
+    def _describe_image_uncached(self, image_data: bytes, context: str, cache_key: bytes) -> Optional[str]:
+        """Return the Gemini description for raw image file bytes, consulting the disk cache first"""
+        cached = self._gemini_cache_get(cache_key)
+        if cached:
+            self.logger.info("Using cached Gemini description for image")
+            return cached
+        
+        # Encoded once as JPEG so the SDK doesn't re-encode it
+        prompt = _GEMINI_PROMPT_TMPL.format(ctx=context)
+        jpeg_data = self._encode_image_for_gemini(image_data)
+        response = self.gemini_model.generate_content([prompt, {"mime_type": "image/jpeg", "data": jpeg_data}])
+        
+        if response and response.text:
+            description = response.text.strip()
+            self._gemini_cache_put(cache_key, description)
+            return description
+        return None
+    
+    def _gemini_cache_connect(self) -> sqlite3.Connection:
+        """Open the description cache database, creating it if needed"""
+        os.makedirs(GEMINI_DISK_CACHE_DIR, exist_ok=True)
+        conn = sqlite3.connect(os.path.join(GEMINI_DISK_CACHE_DIR, "descriptions.sqlite3"), timeout=10)
+        conn.execute("CREATE TABLE IF NOT EXISTS gcache(key BLOB PRIMARY KEY, description TEXT)")
+        return conn
+    
+    def _gemini_cache_get(self, key: bytes) -> Optional[str]:
+        """Look up a cached Gemini description"""
+        try:
+            conn = self._gemini_cache_connect()
+            try:
+                row = conn.execute("SELECT description FROM gcache WHERE key = ?", (key,)).fetchone()
+            finally:
+                conn.close()
+            return row[0] if row else None
+        except sqlite3.Error as e:
+            self.logger.warning(f"Could not read Gemini cache: {e}")
+            return None
+    
+    def _gemini_cache_put(self, key: bytes, description: str):
+        """Store a Gemini description, dropping the oldest entries past the limit"""
+        try:
+            conn = self._gemini_cache_connect()
+            try:
+                with conn:
+                    conn.execute("INSERT OR REPLACE INTO gcache(key, description) VALUES (?, ?)", (key, description))
+                    conn.execute(
+                        "DELETE FROM gcache WHERE rowid IN "
+                        "(SELECT rowid FROM gcache ORDER BY rowid LIMIT max(0, (SELECT COUNT(*) FROM gcache) - ?))",
+                        (GEMINI_DISK_CACHE_MAX_ENTRIES,)
+                    )
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            self.logger.warning(f"Could not write Gemini cache: {e}")
+    
     def _create_image_content_for_embedding(self, image_ref: Dict[str, str], description: str) -> str:
         """Create comprehensive content for image embedding"""
         alt_text = image_ref.get("alt_text", "")
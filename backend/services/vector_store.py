@@ -1,14 +1,37 @@
 import os
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Union
 import logging
-from pinecone import Pinecone, ServerlessSpec
+import numpy as np
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+def _quantize_int8(values: Union[List[float], np.ndarray]) -> Tuple[List[float], float]:
+    """
+    Symmetrically quantize a vector to the int8 range
+    
+    Cosine similarity is scale invariant, so the quantized values can be stored
+    and queried directly; the scale is returned so the original can be recovered.
+    Values are returned as integral floats since Pinecone only accepts floats.
+    """
+    vec = np.asarray(values, dtype=np.float32)
+    max_abs = float(np.max(np.abs(vec))) if vec.size else 0.0
+    if max_abs == 0.0:
+        return [0.0] * vec.size, 1.0
+    
+    scale = 127.0 / max_abs
+    return np.round(vec * scale).astype(np.int8).astype(np.float32).tolist(), scale
+
+def _as_float_list(values: Union[List[float], np.ndarray]) -> List[float]:
+    """Convert a NumPy embedding to the list of floats Pinecone expects"""
+    if isinstance(values, np.ndarray):
+        return values.astype(np.float32, copy=False).tolist()
+    return values
+
 class VectorStore:
     """Service for managing vector storage with Pinecone"""
     
@@ -19,6 +42,10 @@ class VectorStore:
         self.index = None
         self.index_name = os.getenv("PINECONE_INDEX_NAME", "dev-portal-chatbot")
         self.dimension = int(os.getenv("EMBEDDING_DIMENSION", "384"))  # Default for sentence-transformers
+        # Opt-in, REST client only: send int8-quantized values to shrink JSON
+        # payloads (only valid for cosine indexes). Disabled with a warning when
+        # the pinecone[grpc] extra is installed, since gRPC always sends float32
+        self.quantize = os.getenv("PINECONE_QUANTIZE_INT8", "false").lower() == "true"
         
         self._initialize_pinecone()
     
@@ -29,6 +56,18 @@ class VectorStore:
             if not api_key:
                 raise ValueError("PINECONE_API_KEY environment variable is required")
             
+            # Imported here so the client SDK is only loaded when a store is created
+            from pinecone import ServerlessSpec
+            try:
+                # gRPC transport sends vectors as protobuf over a multiplexed HTTP/2 channel
+                from pinecone.grpc import PineconeGRPC as Pinecone
+                if self.quantize:
+                    self.logger.warning("PINECONE_QUANTIZE_INT8 has no effect over gRPC; sending float32 values")
+                    self.quantize = False
+            except ImportError:
+                # pinecone[grpc] extra not installed; fall back to the REST client
+                from pinecone import Pinecone
+            
             # Initialize Pinecone
             self.pc = Pinecone(api_key=api_key)
             
@@ -72,7 +111,7 @@ class VectorStore:
     
     async def upsert_chunk(self, 
         chunk_id: str, 
-        embedding: List[float], 
+        embedding: Union[List[float], np.ndarray], 
         metadata: Dict[str, Any]) -> bool:
         """
         Store a chunk embedding in Pinecone
@@ -90,11 +129,7 @@ class VectorStore:
                 raise ValueError("Pinecone index not initialized")
             
             # Prepare the vector for upsert
-            vector_data = {
-                "id": chunk_id,
-                "values": embedding,
-                "metadata": metadata
-            }
+            vector_data = self._prepare_vector(chunk_id, embedding, metadata)
             
             # Upsert to Pinecone
             self.index.upsert(vectors=[vector_data])
@@ -107,12 +142,16 @@ class VectorStore:
             return False
     
     async def upsert_batch(self, 
-                          chunks: List[Dict[str, Any]]) -> int:
+                          chunks: List[Dict[str, Any]],
+                          batch_size: int = 100,
+                          pool_threads: Optional[int] = None) -> int:
         """
         Batch upsert multiple chunks
         
         Args:
             chunks: List of chunk dictionaries with id, embedding, and metadata
+            batch_size: Number of vectors per upsert request (Pinecone recommends 100 or fewer)
+            pool_threads: Maximum concurrent upsert requests (default executor if None)
         
         Returns:
             Number of successfully upserted chunks
@@ -124,24 +163,29 @@ class VectorStore:
             # Prepare batch data
             vectors = []
             for chunk in chunks:
-                vectors.append({
-                    "id": chunk["id"],
-                    "values": chunk["embedding"],
-                    "metadata": chunk["metadata"]
-                })
-            
-            # Batch upsert (Pinecone recommends batches of 100 or fewer)
-            batch_size = 100
-            successful_upserts = 0
+                vectors.append(self._prepare_vector(chunk["id"], chunk["embedding"], chunk["metadata"]))
+            
+            batches = [vectors[i:i + batch_size] for i in range(0, len(vectors), batch_size)]
+            
+            # Send all batches concurrently so their round-trips overlap
+            loop = asyncio.get_running_loop()
+            executor = ThreadPoolExecutor(max_workers=pool_threads) if pool_threads else None
+            try:
+                tasks = [
+                    loop.run_in_executor(executor, lambda batch=batch: self.index.upsert(vectors=batch))
+                    for batch in batches
+                ]
+                results = await asyncio.gather(*tasks, return_exceptions=True)
+            finally:
+                if executor is not None:
+                    executor.shutdown(wait=False)
             
-            for i in range(0, len(vectors), batch_size):
-                batch = vectors[i:i + batch_size]
-                try:
-                    self.index.upsert(vectors=batch)
-                    successful_upserts += len(batch)
-                except Exception as e:
-                    self.logger.error(f"Error upserting batch {i//batch_size + 1}: {e}")
+            successful_upserts = 0
+            for batch_number, (batch, result) in enumerate(zip(batches, results), 1):
+                if isinstance(result, Exception):
+                    self.logger.error(f"Error upserting batch {batch_number}: {result}")
                     continue
+                successful_upserts += len(batch)
             
             self.logger.info(f"Successfully upserted {successful_upserts}/{len(chunks)} chunks")
             return successful_upserts
@@ -150,8 +194,21 @@ class VectorStore:
             self.logger.error(f"Error in batch upsert: {e}")
             return 0
     
+    def _prepare_vector(self, chunk_id: str, embedding: Union[List[float], np.ndarray],
+                        metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the Pinecone vector payload, quantizing values if enabled"""
+        if not self.quantize:
+            return {"id": chunk_id, "values": _as_float_list(embedding), "metadata": metadata}
+        
+        values, scale = _quantize_int8(embedding)
+        return {
+            "id": chunk_id,
+            "values": values,
+            "metadata": {**metadata, "quantization_scale": scale}
+        }
+    
     async def search(self, 
-                    query_embedding: List[float], 
+                    query_embedding: Union[List[float], np.ndarray], 
                     top_k: int = 5,
                     filter_dict: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """
@@ -169,23 +226,13 @@ class VectorStore:
             if self.index is None:
                 raise ValueError("Pinecone index not initialized")
             
-            # Perform the search
-            search_response = self.index.query(
-                vector=query_embedding,
-                top_k=top_k,
-                include_values=False,
-                include_metadata=True,
-                filter=filter_dict
+            # Perform the search off the event loop
+            loop = asyncio.get_running_loop()
+            search_response = await loop.run_in_executor(
+                None, self._query, self._prepare_query(query_embedding), top_k, filter_dict
             )
             
-            # Format results
-            results = []
-            for match in search_response.matches:
-                results.append({
-                    "id": match.id,
-                    "score": float(match.score),
-                    "metadata": match.metadata
-                })
+            results = self._format_matches(search_response)
             
             self.logger.debug(f"Found {len(results)} matches for query")
             return results
@@ -194,6 +241,75 @@ class VectorStore:
             self.logger.error(f"Error searching vectors: {e}")
             return []
     
+    async def search_batch(self, 
+                          query_embeddings: List[Union[List[float], np.ndarray]], 
+                          top_k: int = 5,
+                          filter_dict: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Search for similar chunks for several queries concurrently
+        
+        Args:
+            query_embeddings: Vector embeddings of the queries
+            top_k: Number of top results to return per query
+            filter_dict: Optional metadata filters applied to every query
+        
+        Returns:
+            List of match lists, in the same order as query_embeddings
+        """
+        try:
+            if self.index is None:
+                raise ValueError("Pinecone index not initialized")
+            
+            # Issue all queries at once so their round-trips overlap
+            loop = asyncio.get_running_loop()
+            tasks = [
+                loop.run_in_executor(None, self._query, self._prepare_query(query_embedding), top_k, filter_dict)
+                for query_embedding in query_embeddings
+            ]
+            responses = await asyncio.gather(*tasks, return_exceptions=True)
+            
+            results = []
+            for query_number, response in enumerate(responses, 1):
+                if isinstance(response, Exception):
+                    self.logger.error(f"Error searching vectors for query {query_number}: {response}")
+                    results.append([])
+                    continue
+                results.append(self._format_matches(response))
+            
+            self.logger.debug(f"Completed {len(results)} searches")
+            return results
+            
+        except Exception as e:
+            self.logger.error(f"Error in batch search: {e}")
+            return [[] for _ in query_embeddings]
+    
+    def _prepare_query(self, query_embedding: Union[List[float], np.ndarray]) -> List[float]:
+        """Quantize the query the same way as the stored vectors"""
+        if self.quantize:
+            return _quantize_int8(query_embedding)[0]
+        return _as_float_list(query_embedding)
+    
+    def _query(self, vector: List[float], top_k: int, filter_dict: Optional[Dict[str, Any]]):
+        """Run a blocking Pinecone query"""
+        return self.index.query(
+            vector=vector,
+            top_k=top_k,
+            include_values=False,
+            include_metadata=True,
+            filter=filter_dict
+        )
+    
+    def _format_matches(self, search_response) -> List[Dict[str, Any]]:
+        """Convert a Pinecone query response into result dictionaries"""
+        return [
+            {
+                "id": match.id,
+                "score": float(match.score),
+                "metadata": match.metadata
+            }
+            for match in search_response.matches
+        ]
+    
     async def delete_chunk(self, chunk_id: str) -> bool:
         """Delete a specific chunk"""
         try:
@@ -214,8 +330,8 @@ class VectorStore:
             if self.index is None:
                 raise ValueError("Pinecone index not initialized")
             
-            # Delete by metadata filter
-            self.index.delete(filter={"source": source})
+            # Delete by metadata filter in a single server-side call
+            self.index.delete(filter={"source": {"$eq": source}})
             self.logger.info(f"Deleted all chunks from source: {source}")
             return True
             
@@ -33,8 +33,7 @@ def test_parser():
     
     print(f"📄 Reading test content from: {test_file.name}")
     
-    with open(test_file, 'r', encoding='utf-8') as f:
-        html_content = f.read()
+    html_content = test_file.read_text(encoding='utf-8')
     
     print(f"📊 HTML content length: {len(html_content):,} characters")
     
@@ -104,9 +103,42 @@ def test_parser():
         traceback.print_exc()
         return False
 
+def test_edge_cases():
+    """Check pages that have no parseable body or carry an XML declaration"""
+    
+    print("\n🔍 Parser Edge Case Test")
+    print("=" * 50)
+    
+    parser = TextParser()
+    cases = [
+        (
+            "XHTML with encoding declaration",
+            '<?xml version="1.0" encoding="UTF-8"?><html><body><h1>Title</h1><p>Body text</p></body></html>',
+            True
+        ),
+        ("Comment-only document", "<!-- nothing here -->", False),
+        ("Whitespace and comment", "  \n<!-- nothing here -->\n  ", False),
+    ]
+    
+    success = True
+    for name, html_content, expect_content in cases:
+        try:
+            result = parser.parse_html_to_markdown(html_content)
+            has_content = result['metadata']['has_content']
+            if has_content == expect_content:
+                print(f"✅ {name}: has_content={has_content}")
+            else:
+                print(f"❌ {name}: expected has_content={expect_content}, got {has_content}")
+                success = False
+        except Exception as e:
+            print(f"❌ {name}: raised {type(e).__name__}: {e}")
+            success = False
+    
+    return success
+
 def main():
     """Main function"""
-    success = test_parser()
+    success = test_parser() and test_edge_cases()
     
     if success:
         print("\n✅ All tests passed!")
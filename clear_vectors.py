@@ -3,6 +3,8 @@ from dotenv import load_dotenv
 from pinecone import Pinecone
 import logging
 import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 # Configure logging
 logging.basicConfig(
@@ -11,6 +13,27 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Deletes are eventually consistent; poll the stats with exponential backoff (~6s total)
+VERIFY_DELAYS = (0.2, 0.4, 0.8, 1.6, 3.2)
+
+# Page size when deleting by listed IDs
+LIST_PAGE_SIZE = 1000
+
+def clear_namespace(index, namespace):
+    """
+    Delete every vector in one namespace
+    
+    Falls back to listing IDs page by page when the index rejects delete_all.
+    """
+    try:
+        index.delete(delete_all=True, namespace=namespace)
+        return
+    except Exception as e:
+        logger.info(f"delete_all not accepted for namespace '{namespace}' ({e}); deleting by listed IDs")
+    
+    for ids in index.list(namespace=namespace, limit=LIST_PAGE_SIZE):
+        index.delete(ids=list(ids), namespace=namespace)
+
 def clear_pinecone_index(confirm=False):
     """
     Delete all vectors from the Pinecone index specified in the environment variables.
@@ -35,14 +58,15 @@ def clear_pinecone_index(confirm=False):
         # Get the index
         index = pc.Index(index_name)
         
-        # Get current stats
+        # One stats call gives both the count for the prompt and the namespaces to clear
         stats = index.describe_index_stats()
         vector_count = stats.total_vector_count
+        namespaces = list(stats.namespaces) if stats.namespaces else [""]
         
         if vector_count == 0:
             logger.info("Index is already empty. No vectors to delete.")
             return
-            
+        
         # Confirm deletion if not auto-confirmed
         if not confirm:
             response = input(f"Are you sure you want to delete all {vector_count} vectors from index '{index_name}'? (y/N): ")
@@ -50,16 +74,25 @@ def clear_pinecone_index(confirm=False):
                 logger.info("Operation cancelled.")
                 return
         
-        # Delete all vectors
-        logger.info(f"Deleting all vectors from index '{index_name}'...")
-        index.delete(delete_all=True)
+        # Delete all vectors, clearing the namespaces concurrently
+        logger.info(f"Deleting all vectors from index '{index_name}' ({len(namespaces)} namespaces)...")
+        with ThreadPoolExecutor(max_workers=len(namespaces)) as executor:
+            futures = [executor.submit(clear_namespace, index, namespace) for namespace in namespaces]
+            for future in futures:
+                future.result()
         
         # Verify deletion
-        new_stats = index.describe_index_stats()
-        if new_stats.total_vector_count == 0:
+        remaining = None
+        for delay in VERIFY_DELAYS:
+            time.sleep(delay)
+            remaining = index.describe_index_stats().total_vector_count
+            if remaining == 0:
+                break
+        
+        if remaining == 0:
             logger.info("Successfully deleted all vectors from the index.")
         else:
-            logger.warning(f"Some vectors may remain. Current count: {new_stats.total_vector_count}")
+            logger.info(f"Delete issued; index still reports {remaining} vectors while it catches up.")
             
     except Exception as e:
         logger.error(f"Error clearing Pinecone index: {e}")
@@ -1,10 +1,18 @@
 import streamlit as st
-import requests
-import json
+import os
 from datetime import datetime
-from typing import Dict, Any, List
-import time
-import base64
+
+from ui_utils import (
+    display_accuracy_metrics,
+    display_chat_message,
+    export_chat_history,
+    fragment,
+    get_custom_css,
+    get_health_monitor,
+    get_query_cache,
+    stream_api_request,
+    suggestion_buttons,
+)
 
 # Configure Streamlit page
 st.set_page_config(
@@ -14,11 +22,11 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Backend API configuration
-BACKEND_URL = "http://localhost:8000"
+# "full" shows the control panel and accuracy metrics; "basic" is chat only
+FULL_UI = os.getenv("UI_MODE", "full") == "full"
 
 # Predefined question suggestions
-QUESTION_SUGGESTIONS = [
+QUESTION_SUGGESTIONS = (
     "How does the order management process work?",
     "What are the authentication requirements?",
     "How do I integrate with the payment system?",
@@ -26,254 +34,15 @@ QUESTION_SUGGESTIONS = [
     "How is error handling implemented?",
     "What are the database schema requirements?",
     "How do I set up the development environment?"
-]
-
-# Custom CSS for better UI
-st.markdown("""
-<style>
-    .main-header {
-        font-size: 2.5rem;
-        font-weight: bold;
-        color: #1f77b4;
-        text-align: center;
-        margin-bottom: 2rem;
-        background: linear-gradient(90deg, #1f77b4, #2ca02c);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        background-clip: text;
-    }
-    
-    .chat-container {
-        max-height: 600px;
-        overflow-y: auto;
-        padding: 1rem;
-        border: 1px solid #ddd;
-        border-radius: 10px;
-        background-color: #fafafa;
-        margin-bottom: 1rem;
-    }
-    
-    .chat-message {
-        padding: 1rem;
-        margin: 0.5rem 0;
-        border-radius: 10px;
-        border-left: 4px solid #1f77b4;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-        animation: fadeIn 0.3s ease-in;
-    }
-    
-    @keyframes fadeIn {
-        from { opacity: 0; transform: translateY(10px); }
-        to { opacity: 1; transform: translateY(0); }
-    }
-    
-    .user-message {
-        background: linear-gradient(135deg, #e8f4fd, #d1e7fd);
-        border-left-color: #1f77b4;
-        margin-left: 2rem;
-    }
-    
-    .bot-message {
-        background: linear-gradient(135deg, #f0f8e8, #e8f5e8);
-        border-left-color: #2ca02c;
-        margin-right: 2rem;
-    }
-    
-    .question-suggestion {
-        background-color: #f8f9fa;
-        border: 1px solid #dee2e6;
-        border-radius: 20px;
-        padding: 0.5rem 1rem;
-        margin: 0.25rem;
-        cursor: pointer;
-        transition: all 0.2s;
-        display: inline-block;
-    }
-    
-    .question-suggestion:hover {
-        background-color: #e9ecef;
-        transform: translateY(-1px);
-    }
-    
-    .sidebar-info {
-        background-color: #f8f9fa;
-        padding: 1rem;
-        border-radius: 10px;
-        margin-bottom: 1rem;
-    }
-    
-    .status-indicator {
-        display: inline-block;
-        width: 10px;
-        height: 10px;
-        border-radius: 50%;
-        margin-right: 5px;
-    }
-    
-    .status-online { background-color: #28a745; }
-    .status-offline { background-color: #dc3545; }
-    .status-checking { background-color: #ffc107; animation: pulse 1s infinite; }
-    
-    @keyframes pulse {
-        0% { opacity: 1; }
-        50% { opacity: 0.5; }
-        100% { opacity: 1; }
-    }
-</style>
-""", unsafe_allow_html=True)
-
-# Helper functions
-def check_backend_status() -> bool:
-    """Check if backend is accessible"""
-    try:
-        response = requests.get(f"{BACKEND_URL}/health", timeout=5)
-        return response.status_code == 200
-    except:
-        return False
-
-def make_api_request(endpoint: str, method: str = "GET", data: Dict = None, retries: int = 3) -> Dict[str, Any]:
-    """Make API request to backend with retry mechanism"""
-    for attempt in range(retries):
-        try:
-            url = f"{BACKEND_URL}{endpoint}"
-            
-            if method == "GET":
-                response = requests.get(url, timeout=30)
-            elif method == "POST":
-                response = requests.post(url, json=data, timeout=30)
-            else:
-                raise ValueError(f"Unsupported method: {method}")
-            
-            response.raise_for_status()
-            return response.json()
-            
-        except requests.exceptions.ConnectionError:
-            if attempt == retries - 1:
-                st.error("❌ Cannot connect to backend API. Make sure the backend is running on port 8000.")
-                return {"error": "Connection failed"}
-            time.sleep(1)
-        except requests.exceptions.Timeout:
-            if attempt == retries - 1:
-                st.error("❌ Request timed out. The backend might be busy.")
-                return {"error": "Request timed out"}
-            time.sleep(1)
-        except requests.exceptions.HTTPError as e:
-            st.error(f"❌ API Error: {e}")
-            return {"error": str(e)}
-        except Exception as e:
-            st.error(f"❌ Unexpected error: {e}")
-            return {"error": str(e)}
-    
-    return {"error": "Max retries exceeded"}
-
-def display_accuracy_metrics(metrics: Dict[str, Any]):
-    """Display accuracy metrics in a compact, visually appealing format"""
-    if not metrics or "overall_accuracy" not in metrics:
-        return
-    
-    overall = metrics.get("overall_accuracy", {})
-    retrieval = metrics.get("retrieval_performance", {})
-    content = metrics.get("content_analysis", {})
-    answer_quality = metrics.get("answer_quality", {})
-    
-    # Overall accuracy display
-    accuracy_score = overall.get("score", 0.5)
-    accuracy_level = overall.get("level", "Medium")
-    accuracy_color = overall.get("color", "orange")
-    
-    # Color mapping for Streamlit
-    color_map = {"green": "🟢", "orange": "🟡", "red": "🔴"}
-    score_icon = color_map.get(accuracy_color, "🟡")
-    
-    with st.expander(f"📊 **Accuracy Metrics** {score_icon} **{accuracy_level}** ({accuracy_score:.1%})", expanded=False):
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            st.markdown("#### 🎯 Retrieval Quality")
-            hit_rate = retrieval.get("hit_rate", 0)
-            precision = retrieval.get("precision_at_k", 0)
-            mean_sim = retrieval.get("mean_similarity", 0)
-            
-            st.metric("Hit Rate", f"{hit_rate:.1%}")
-            st.metric("Precision@3", f"{precision:.1%}")
-            st.metric("Avg Similarity", f"{mean_sim:.2f}")
-            
-        with col2:
-            st.markdown("#### 📝 Answer Quality")
-            relevance = answer_quality.get("relevance", {})
-            quality_metrics = answer_quality.get("quality_metrics", {})
-            
-            rel_score = relevance.get("relevance_score", 0)
-            faithfulness = quality_metrics.get("faithfulness", 50)
-            completeness = quality_metrics.get("completeness", 50)
-            
-            st.metric("Relevance", f"{rel_score:.1%}")
-            st.metric("Faithfulness", f"{faithfulness:.0f}/100")
-            st.metric("Completeness", f"{completeness:.0f}/100")
-            
-        with col3:
-            st.markdown("#### 🔍 Content Coverage")
-            types_used = content.get("unique_content_types", 0)
-            diversity = content.get("diversity_score", 0)
-            coverage = content.get("coverage_analysis", {})
-            
-            st.metric("Content Types", f"{types_used}/3")
-            st.metric("Diversity Score", f"{diversity:.1%}")
-            
-            # Content type indicators
-            indicators = []
-            if coverage.get("has_text"): indicators.append("📄 Text")
-            if coverage.get("has_image"): indicators.append("🖼️ Image")
-            if coverage.get("has_openapi"): indicators.append("⚙️ API")
-            
-            if indicators:
-                st.write("**Used:** " + " | ".join(indicators))
-
-
-def display_chat_message(message: Dict[str, Any], is_user: bool = False):
-    """Display a chat message with proper formatting"""
-    message_class = "user-message" if is_user else "bot-message"
-    icon = "👤" if is_user else "🤖"
-    
-    with st.container():
-        if is_user:
-            content = message.get('content', '')
-        else:
-            # Support markdown formatting for bot responses
-            content = message.get('content', '')
-        
-        st.markdown(f"""
-        <div class="chat-message {message_class}">
-            <strong>{icon} {"You" if is_user else "Assistant"}:</strong><br>
-            {content}
-        </div>
-        """, unsafe_allow_html=True)
+)
 
-def export_chat_history() -> str:
-    """Export chat history as downloadable text"""
-    if not st.session_state.chat_history:
-        return ""
-    
-    export_text = f"Chat History Export - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
-    export_text += "=" * 50 + "\n\n"
-    
-    for message in st.session_state.chat_history:
-        timestamp = message.get('timestamp', 'Unknown time')
-        if message["type"] == "user":
-            export_text += f"[{timestamp}] USER: {message['content']}\n\n"
-        else:
-            answer = message["content"].get("answer", "No answer received")
-            export_text += f"[{timestamp}] ASSISTANT: {answer}\n\n"
-    
-    return export_text
+# The style element must be sent on every run, or Streamlit drops it
+st.markdown(get_custom_css(), unsafe_allow_html=True)
 
 # Initialize session state
 if "chat_history" not in st.session_state:
     st.session_state.chat_history = []
 
-if "input_counter" not in st.session_state:
-    st.session_state.input_counter = 0
-
 if "backend_status" not in st.session_state:
     st.session_state.backend_status = None
 
@@ -281,170 +50,144 @@ if "last_status_check" not in st.session_state:
     st.session_state.last_status_check = 0
 
 # Sidebar
-with st.sidebar:
-    st.markdown("## 🛠️ Control Panel")
-    
-    # Backend status check
-    current_time = time.time()
-    if current_time - st.session_state.last_status_check > 30:  # Check every 30 seconds
-        st.session_state.backend_status = check_backend_status()
-        st.session_state.last_status_check = current_time
-    
-    status_class = "status-online" if st.session_state.backend_status else "status-offline"
-    status_text = "Online" if st.session_state.backend_status else "Offline"
-    
-    st.markdown(f"""
-    <div class="sidebar-info">
-        <strong>Backend Status:</strong><br>
-        <span class="status-indicator {status_class}"></span>{status_text}
-    </div>
-    """, unsafe_allow_html=True)
-    
-    # Chat statistics
-    total_messages = len(st.session_state.chat_history)
-    user_messages = len([m for m in st.session_state.chat_history if m["type"] == "user"])
-    
-    st.markdown(f"""
-    <div class="sidebar-info">
-        <strong>Chat Statistics:</strong><br>
-        Total Messages: {total_messages}<br>
-        Questions Asked: {user_messages}
-    </div>
-    """, unsafe_allow_html=True)
-    
-    # Export chat history
-    if st.session_state.chat_history:
-        if st.button("📥 Export Chat History"):
-            export_text = export_chat_history()
-            st.download_button(
-                label="Download Chat History",
-                data=export_text,
-                file_name=f"chat_history_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
-                mime="text/plain"
-            )
-    
-    # Clear chat button
-    if st.button("🗑️ Clear Chat History", type="secondary"):
-        st.session_state.chat_history = []
-        st.rerun()
-    
-    # Quick settings
-    st.markdown("### ⚙️ Settings")
-    st.info("🔧 **Fixed Configuration**: Retrieving top 3 most relevant chunks for optimal accuracy")
+if FULL_UI:
+    with st.sidebar:
+        st.markdown("## 🛠️ Control Panel")
+        
+        # Backend status check (refreshed by the background monitor)
+        health_monitor = get_health_monitor()
+        st.session_state.backend_status = health_monitor.status
+        st.session_state.last_status_check = health_monitor.last_check
+        
+        status_class = "status-online" if st.session_state.backend_status else "status-offline"
+        status_text = "Online" if st.session_state.backend_status else "Offline"
+        
+        st.markdown(f"""
+        <div class="sidebar-info">
+            <strong>Backend Status:</strong><br>
+            <span class="status-indicator {status_class}"></span>{status_text}
+        </div>
+        """, unsafe_allow_html=True)
+        
+        # Chat statistics
+        total_messages = len(st.session_state.chat_history)
+        user_messages = len([m for m in st.session_state.chat_history if m["type"] == "user"])
+        query_cache = get_query_cache()
+        
+        st.markdown(f"""
+        <div class="sidebar-info">
+            <strong>Chat Statistics:</strong><br>
+            Total Messages: {total_messages}<br>
+            Questions Asked: {user_messages}<br>
+            Cache Hits/Misses: {query_cache.hits}/{query_cache.misses}
+        </div>
+        """, unsafe_allow_html=True)
+        
+        # Export chat history
+        if st.session_state.chat_history:
+            if st.button("📥 Export Chat History"):
+                export_text = export_chat_history()
+                st.download_button(
+                    label="Download Chat History",
+                    data=export_text,
+                    file_name=f"chat_history_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
+                    mime="text/plain"
+                )
+        
+        # Clear chat button
+        if st.button("🗑️ Clear Chat History", type="secondary"):
+            st.session_state.chat_history = []
+            st.rerun()
+        
+        # Quick settings
+        st.markdown("### ⚙️ Settings")
+        st.info("🔧 **Fixed Configuration**: Retrieving top 3 most relevant chunks for optimal accuracy")
 
 # Main UI
 st.markdown('<h1 class="main-header">🤖 Development Portal Q&A Assistant</h1>', unsafe_allow_html=True)
 
-# Question suggestions
-if not st.session_state.chat_history:
-    st.markdown("### 💡 Try asking about:")
+@fragment
+def chat_panel():
+    """Chat history and input; a question reruns only this panel, not the whole page"""
+    # Question suggestions and welcome message, cleared once a question is asked
+    intro_placeholder = st.empty()
+    if not st.session_state.chat_history:
+        with intro_placeholder.container():
+            st.markdown("### 💡 Try asking about:")
+            
+            cols = st.columns(2)
+            for i, (key, label, suggestion) in enumerate(suggestion_buttons(QUESTION_SUGGESTIONS)):
+                col = cols[i % 2]
+                with col:
+                    if st.button(label, key=key):
+                        # Ask the suggestion on this run
+                        st.session_state.pending_question = suggestion
+            
+            st.info("👋 Welcome! Ask a question to get started.")
     
-    cols = st.columns(2)
-    for i, suggestion in enumerate(QUESTION_SUGGESTIONS):
-        col = cols[i % 2]
-        with col:
-            if st.button(f"💭 {suggestion}", key=f"suggestion_{i}"):
-                st.session_state.input_counter += 1
-                # Set the suggestion as the input
-                st.rerun()
-
-# Chat container
-chat_container = st.container()
-
-with chat_container:
-    if st.session_state.chat_history:
-        st.markdown('<div class="chat-container">', unsafe_allow_html=True)
-        for message in st.session_state.chat_history:
-            if message["type"] == "user":
-                display_chat_message({"content": message["content"]}, is_user=True)
-            else:
-                # Display the answer from the response
-                answer = message["content"].get("answer", "No answer received")
-                display_chat_message({"content": answer}, is_user=False)
-                
-                # Display accuracy metrics if available
-                accuracy_metrics = message["content"].get("accuracy_metrics")
-                if accuracy_metrics:
-                    display_accuracy_metrics(accuracy_metrics)
-        st.markdown('</div>', unsafe_allow_html=True)
-    else:
-        st.info("👋 Welcome! Ask a question to get started.")
-
-# Question input
-col1, col2 = st.columns([4, 1])
-
-with col1:
-    question_input = st.text_input(
-        "Ask your question:",
-        placeholder="e.g., How does the order management process work?",
-        key=f"question_input_{st.session_state.input_counter}"
-    )
-
-with col2:
-    ask_button = st.button("🚀 Ask", type="primary", use_container_width=True)
-
-# Handle question submission
-if ask_button or (question_input and st.session_state.get('enter_pressed')):
-    if question_input and question_input.strip():
-        # Add user message to chat history
-        st.session_state.chat_history.append({
-            "type": "user",
-            "content": question_input,
-            "timestamp": datetime.now().isoformat()
-        })
-        
-        # Get answer from API
-        with st.spinner("🤔 Analyzing your question..."):
-            progress_bar = st.progress(0)
-            for i in range(100):
-                time.sleep(0.01)
-                progress_bar.progress(i + 1)
+    # Chat history
+    for message in st.session_state.chat_history:
+        display_chat_message(message, show_metrics=FULL_UI)
+    
+    # Question input
+    chat_prompt = st.chat_input("Ask your question, e.g. How does the order management process work?")
+    question_input = chat_prompt or st.session_state.pop("pending_question", None)
+    
+    # Handle question submission
+    if question_input is not None:
+        if question_input.strip():
+            intro_placeholder.empty()
             
-            response = make_api_request(
-                "/qa/ask",
-                method="POST",
-                data={
-                    "question": question_input
-                }
-            )
+            # Add user message to chat history
+            user_message = {
+                "type": "user",
+                "content": question_input,
+                "timestamp": datetime.now().isoformat()
+            }
+            st.session_state.chat_history.append(user_message)
+            display_chat_message(user_message, show_metrics=FULL_UI)
             
-            progress_bar.empty()
-
-            if isinstance(response, dict) and "error" not in response:
-                # Check if we have an answer
-                answer = response.get("answer", "")
+            # Get answer from API
+            with st.chat_message("assistant", avatar="🤖"):
+                # Render the answer as it streams in
+                answer_placeholder = st.empty()
+                answer_placeholder.markdown("🤔 Analyzing your question...")
+                streamed_answer = ""
+                response = {"error": "No response received"}
+                
+                for event in stream_api_request("/qa/ask/stream", data={"question": question_input}):
+                    if event["type"] == "token":
+                        streamed_answer += event["content"]
+                        answer_placeholder.markdown(streamed_answer)
+                    elif event["type"] == "result":
+                        response = event["data"]
+                    else:
+                        response = {"error": event.get("error", "Unknown error occurred")}
                 
-                if answer:
-                    # Add bot response to chat history
-                    st.session_state.chat_history.append({
-                        "type": "bot",
-                        "content": response,
-                        "timestamp": datetime.now().isoformat()
-                    })
+                if isinstance(response, dict) and "error" not in response:
+                    # Check if we have an answer
+                    answer = response.get("answer", "")
                     
-                    st.success("✅ Question answered!")
+                    if answer:
+                        # Add bot response to chat history
+                        st.session_state.chat_history.append({
+                            "type": "bot",
+                            "content": response,
+                            "timestamp": datetime.now().isoformat()
+                        })
+                        
+                        answer_placeholder.markdown(answer)
+                        accuracy_metrics = response.get("accuracy_metrics")
+                        if FULL_UI and accuracy_metrics:
+                            display_accuracy_metrics(accuracy_metrics)
+                    else:
+                        answer_placeholder.empty()
+                        st.error("❌ No answer received from the system")
                 else:
-                    st.error("❌ No answer received from the system")
-            else:
-                error_msg = response.get("error", "Unknown error occurred") if isinstance(response, dict) else str(response)
-                st.error(f"❌ Error: {error_msg}")
-        
-        # Clear input by incrementing counter
-        st.session_state.input_counter += 1
-        st.rerun()
-    else:
-        st.warning("Please enter a question!")
+                    answer_placeholder.empty()
+                    error_msg = response.get("error", "Unknown error occurred") if isinstance(response, dict) else str(response)
+                    st.error(f"❌ Error: {error_msg}")
+        else:
+            st.warning("Please enter a question!")
 
-# JavaScript for Enter key handling
-st.markdown("""
-<script>
-document.addEventListener('keydown', function(e) {
-    if (e.key === 'Enter' && e.target.tagName === 'INPUT') {
-        e.preventDefault();
-        // Trigger button click
-        const button = document.querySelector('[data-testid="baseButton-primary"]');
-        if (button) button.click();
-    }
-});
-</script>
-""", unsafe_allow_html=True) 
\ No newline at end of file
+chat_panel()
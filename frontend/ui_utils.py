@@ -0,0 +1,384 @@
+"""
+Shared helpers for the Streamlit frontend: backend API access, caching,
+health monitoring, styling and chat rendering
+"""
+
+import streamlit as st
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import json
+import hashlib
+try:
+    # orjson parses and serializes several times faster than the stdlib
+    import orjson
+except ImportError:
+    orjson = None
+from collections import OrderedDict
+from functools import lru_cache
+from datetime import datetime
+from typing import Dict, Any, Optional, Tuple
+import time
+import re
+import threading
+try:
+    # Lets the health monitor hold a socket open instead of polling over HTTP
+    from websockets.sync.client import connect as ws_connect
+except ImportError:
+    ws_connect = None
+
+# Backend API configuration
+BACKEND_URL = "http://localhost:8000"
+HEALTH_WS_URL = BACKEND_URL.replace("http", "ws", 1) + "/ws/health"
+
+# Shared session keeps connections to the backend alive; transient failures
+# are retried by the adapter with exponential backoff. POSTs are only retried
+# when the connection failed, so a question is never answered twice
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=10,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=[502, 503, 504],
+        allowed_methods=frozenset({"GET"}),
+        raise_on_status=False
+    )
+))
+
+# Request bodies are serialized by json_dumps rather than by requests
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Scopes reruns to part of the page (Streamlit >= 1.33); on older versions the
+# decorated function simply runs as part of the full script
+fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda func: func)
+
+# Backend health is polled from a background thread so reruns never wait on it
+HEALTH_CHECK_INTERVAL = 30
+HEALTH_CHECK_TIMEOUT = 2
+HEALTH_RECONNECT_DELAY = 2
+
+# Answers to repeated questions are served from a per-session cache
+QUERY_CACHE_MAX_SIZE = 256
+QUERY_CACHE_TTL_SECONDS = 600
+
+# Custom CSS for better UI
+CUSTOM_CSS = """
+<style>
+    .main-header {
+        font-size: 2.5rem;
+        font-weight: bold;
+        color: #1f77b4;
+        text-align: center;
+        margin-bottom: 2rem;
+        background: linear-gradient(90deg, #1f77b4, #2ca02c);
+        -webkit-background-clip: text;
+        -webkit-text-fill-color: transparent;
+        background-clip: text;
+    }
+    
+    .question-suggestion {
+        background-color: #f8f9fa;
+        border: 1px solid #dee2e6;
+        border-radius: 20px;
+        padding: 0.5rem 1rem;
+        margin: 0.25rem;
+        cursor: pointer;
+        transition: all 0.2s;
+        display: inline-block;
+    }
+    
+    .question-suggestion:hover {
+        background-color: #e9ecef;
+        transform: translateY(-1px);
+    }
+    
+    .sidebar-info {
+        background-color: #f8f9fa;
+        padding: 1rem;
+        border-radius: 10px;
+        margin-bottom: 1rem;
+    }
+    
+    .status-indicator {
+        display: inline-block;
+        width: 10px;
+        height: 10px;
+        border-radius: 50%;
+        margin-right: 5px;
+    }
+    
+    .status-online { background-color: #28a745; }
+    .status-offline { background-color: #dc3545; }
+    .status-checking { background-color: #ffc107; animation: pulse 1s infinite; }
+    
+    @keyframes pulse {
+        0% { opacity: 1; }
+        50% { opacity: 0.5; }
+        100% { opacity: 1; }
+    }
+</style>
+"""
+
+@st.cache_resource
+def get_custom_css() -> str:
+    """Custom CSS with whitespace collapsed, built once per process"""
+    return re.sub(r"\s+", " ", CUSTOM_CSS).strip()
+
+class QueryCache:
+    """Thread-safe LRU cache of API responses with a per-entry time to live"""
+    
+    def __init__(self, max_size: int = QUERY_CACHE_MAX_SIZE, ttl_seconds: float = QUERY_CACHE_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached response for key, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() - entry[0] > self.ttl_seconds:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def put(self, key: str, value: Dict[str, Any]):
+        """Store a response, evicting the least recently used entry when full"""
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+# Helper functions
+def get_query_cache() -> QueryCache:
+    """Get the query cache for the current session"""
+    if "query_cache" not in st.session_state:
+        st.session_state.query_cache = QueryCache()
+    return st.session_state.query_cache
+
+def check_backend_status() -> bool:
+    """Check if backend is accessible"""
+    try:
+        response = SESSION.get(f"{BACKEND_URL}/health", timeout=HEALTH_CHECK_TIMEOUT)
+        return response.status_code == 200
+    except:
+        return False
+
+class HealthMonitor:
+    """
+    Tracks backend health on a daemon thread
+    
+    Holds the /ws/health socket open so a restart or outage shows up as soon as
+    the connection drops; falls back to polling /health when websockets isn't
+    installed.
+    """
+    
+    def __init__(self, interval: float = HEALTH_CHECK_INTERVAL):
+        self.interval = interval
+        self.status = None
+        self.last_check = 0
+        target = self._listen if ws_connect is not None else self._poll
+        self._thread = threading.Thread(target=target, daemon=True)
+        self._thread.start()
+    
+    def _listen(self):
+        while True:
+            try:
+                with ws_connect(HEALTH_WS_URL, open_timeout=HEALTH_CHECK_TIMEOUT) as websocket:
+                    for message in websocket:
+                        self.status = bool(json_loads(message).get("ok"))
+                        self.last_check = time.time()
+            except Exception:
+                pass
+            
+            # Disconnected or unreachable; retry quickly so recovery is noticed
+            self.status = False
+            self.last_check = time.time()
+            time.sleep(HEALTH_RECONNECT_DELAY)
+    
+    def _poll(self):
+        while True:
+            self.status = check_backend_status()
+            self.last_check = time.time()
+            time.sleep(self.interval)
+
+@st.cache_resource
+def get_health_monitor() -> HealthMonitor:
+    """Start a single health monitor shared by all sessions"""
+    return HealthMonitor()
+
+def json_dumps(data: Any) -> bytes:
+    """Serialize data to JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data).encode('utf-8')
+
+def json_loads(data: bytes) -> Any:
+    """Parse JSON bytes or text"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def query_cache_key(data: Dict) -> str:
+    """Cache key for a question request body"""
+    return hashlib.sha1(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+def stream_api_request(endpoint: str, data: Dict = None):
+    """
+    POST to a streaming endpoint and yield its newline-delimited JSON events
+    
+    Yields "token" events as the answer is generated and a final "result" event
+    with the complete response; failures are reported as an "error" event.
+    """
+    # Repeated questions replay the cached response as a single result event
+    query_cache = get_query_cache()
+    cache_key = query_cache_key(data)
+    cached = query_cache.get(cache_key)
+    if cached is not None:
+        yield {"type": "result", "data": cached}
+        return
+    
+    try:
+        url = f"{BACKEND_URL}{endpoint}"
+        with SESSION.post(url, data=json_dumps(data), headers=JSON_HEADERS, stream=True, timeout=30) as response:
+            response.raise_for_status()
+            
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                event = json_loads(line)
+                if event.get("type") == "result":
+                    # Only successful answers are cached so failures reach the backend again
+                    result = event["data"]
+                    if result.get("success") and "error" not in result:
+                        query_cache.put(cache_key, result)
+                yield event
+        
+    except requests.exceptions.ConnectionError:
+        st.error("❌ Cannot connect to backend API. Make sure the backend is running on port 8000.")
+        yield {"type": "error", "error": "Connection failed"}
+    except requests.exceptions.Timeout:
+        st.error("❌ Request timed out. The backend might be busy.")
+        yield {"type": "error", "error": "Request timed out"}
+    except requests.exceptions.HTTPError as e:
+        st.error(f"❌ API Error: {e}")
+        yield {"type": "error", "error": str(e)}
+    except Exception as e:
+        st.error(f"❌ Unexpected error: {e}")
+        yield {"type": "error", "error": str(e)}
+
+def display_accuracy_metrics(metrics: Dict[str, Any]):
+    """Display accuracy metrics in a compact, visually appealing format"""
+    if not metrics or "overall_accuracy" not in metrics:
+        return
+    
+    overall = metrics.get("overall_accuracy", {})
+    retrieval = metrics.get("retrieval_performance", {})
+    content = metrics.get("content_analysis", {})
+    answer_quality = metrics.get("answer_quality", {})
+    
+    # Overall accuracy display
+    accuracy_score = overall.get("score", 0.5)
+    accuracy_level = overall.get("level", "Medium")
+    accuracy_color = overall.get("color", "orange")
+    
+    # Color mapping for Streamlit
+    color_map = {"green": "🟢", "orange": "🟡", "red": "🔴"}
+    score_icon = color_map.get(accuracy_color, "🟡")
+    
+    with st.expander(f"📊 **Accuracy Metrics** {score_icon} **{accuracy_level}** ({accuracy_score:.1%})", expanded=False):
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            st.markdown("#### 🎯 Retrieval Quality")
+            hit_rate = retrieval.get("hit_rate", 0)
+            precision = retrieval.get("precision_at_k", 0)
+            mean_sim = retrieval.get("mean_similarity", 0)
+            
+            st.metric("Hit Rate", f"{hit_rate:.1%}")
+            st.metric("Precision@3", f"{precision:.1%}")
+            st.metric("Avg Similarity", f"{mean_sim:.2f}")
+            
+        with col2:
+            st.markdown("#### 📝 Answer Quality")
+            relevance = answer_quality.get("relevance", {})
+            quality_metrics = answer_quality.get("quality_metrics", {})
+            
+            rel_score = relevance.get("relevance_score", 0)
+            faithfulness = quality_metrics.get("faithfulness", 50)
+            completeness = quality_metrics.get("completeness", 50)
+            
+            st.metric("Relevance", f"{rel_score:.1%}")
+            st.metric("Faithfulness", f"{faithfulness:.0f}/100")
+            st.metric("Completeness", f"{completeness:.0f}/100")
+            
+        with col3:
+            st.markdown("#### 🔍 Content Coverage")
+            types_used = content.get("unique_content_types", 0)
+            diversity = content.get("diversity_score", 0)
+            coverage = content.get("coverage_analysis", {})
+            
+            st.metric("Content Types", f"{types_used}/3")
+            st.metric("Diversity Score", f"{diversity:.1%}")
+            
+            # Content type indicators
+            indicators = []
+            if coverage.get("has_text"): indicators.append("📄 Text")
+            if coverage.get("has_image"): indicators.append("🖼️ Image")
+            if coverage.get("has_openapi"): indicators.append("⚙️ API")
+            
+            if indicators:
+                st.write("**Used:** " + " | ".join(indicators))
+
+
+def display_chat_message(message: Dict[str, Any], show_metrics: bool = True):
+    """Display a chat history entry with Streamlit's native chat elements"""
+    if message["type"] == "user":
+        with st.chat_message("user", avatar="👤"):
+            st.markdown(message["content"])
+        return
+    
+    with st.chat_message("assistant", avatar="🤖"):
+        # Display the answer from the response
+        st.markdown(message["content"].get("answer", "No answer received"))
+        
+        # Display accuracy metrics if available
+        accuracy_metrics = message["content"].get("accuracy_metrics")
+        if show_metrics and accuracy_metrics:
+            display_accuracy_metrics(accuracy_metrics)
+
+@lru_cache(maxsize=8)
+def suggestion_buttons(suggestions: Tuple[str, ...]) -> Tuple[Tuple[str, str, str], ...]:
+    """(widget key, label, question) for each suggestion button, formatted once per process"""
+    return tuple(
+        (f"suggestion_{i}", f"💭 {suggestion}", suggestion)
+        for i, suggestion in enumerate(suggestions)
+    )
+
+def export_chat_history() -> str:
+    """Export chat history as downloadable text"""
+    if not st.session_state.chat_history:
+        return ""
+    
+    export_text = f"Chat History Export - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+    export_text += "=" * 50 + "\n\n"
+    
+    for message in st.session_state.chat_history:
+        timestamp = message.get('timestamp', 'Unknown time')
+        if message["type"] == "user":
+            export_text += f"[{timestamp}] USER: {message['content']}\n\n"
+        else:
+            answer = message["content"].get("answer", "No answer received")
+            export_text += f"[{timestamp}] ASSISTANT: {answer}\n\n"
+    
+    return export_text
@@ -1,9 +1,84 @@
 import os
-from huggingface_hub import InferenceClient
+import asyncio
+import hashlib
+import io
+import json
+import sqlite3
+import time
+from typing import Any, Optional, Union
+from huggingface_hub import AsyncInferenceClient
+try:
+    from huggingface_hub.errors import HfHubHTTPError
+except ImportError:
+    # huggingface_hub < 0.24 keeps its exceptions in utils
+    from huggingface_hub.utils import HfHubHTTPError
 from PIL import Image
 import dotenv
 dotenv.load_dotenv()
 
+# Inference results keyed by image content, model and question; captions of a
+# byte-identical image from a fixed model don't change, so entries never expire
+HF_CACHE_DIR = os.getenv("HF_CACHE_DIR", ".hf_cache")
+
+# Caption models compared by the comprehensive analysis
+CAPTION_MODELS = (
+    "Salesforce/blip-image-captioning-base",
+    "Salesforce/blip-image-captioning-large",
+    "nlpconnect/vit-gpt2-image-captioning"
+)
+
+# Models raced by get_best_caption; blip-large is left out because its
+# serverless endpoint has by far the slowest cold start
+BEST_CAPTION_MODELS = (
+    "Salesforce/blip-image-captioning-base",
+    "nlpconnect/vit-gpt2-image-captioning",
+    "microsoft/git-base"
+)
+
+VQA_MODEL = "dandelin/vilt-b32-finetuned-vqa"
+
+# Once this many calls in a row fail with an auth or quota error, further
+# calls are skipped instead of sent; the same error would just come back.
+# Auth failures keep the circuit open; after a 429 it lets one trial call
+# through once the cooldown has passed, and closes again if that succeeds
+CIRCUIT_BREAKER_THRESHOLD = 2
+CIRCUIT_AUTH_STATUSES = frozenset((401, 403))
+CIRCUIT_RATE_LIMIT_STATUS = 429
+CIRCUIT_COOLDOWN_SECONDS = 60
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of making a call while the circuit breaker is open"""
+
+def _http_status(error: Exception) -> Optional[int]:
+    """HTTP status code carried by an inference error, if any"""
+    if isinstance(error, HfHubHTTPError):
+        return getattr(error.response, "status_code", None)
+    # The aiohttp-based async client raises ClientResponseError with .status
+    status = getattr(error, "status", None)
+    return status if isinstance(status, int) else None
+
+# Caption models sent a tiny inference request at startup, alongside VQA_MODEL,
+# so their serverless endpoints load while the caller is still setting up
+WARMUP_CAPTION_MODELS = tuple(dict.fromkeys(CAPTION_MODELS + BEST_CAPTION_MODELS))
+
+def _warmup_image() -> bytes:
+    """A 1x1 PNG, the smallest valid input for a warm-up request"""
+    buffer = io.BytesIO()
+    Image.new("RGB", (1, 1), "white").save(buffer, "PNG")
+    return buffer.getvalue()
+
+def _caption_text(output) -> str:
+    """Plain caption string from an image_to_text response"""
+    return getattr(output, "generated_text", output)
+
+def _vqa_answers(output) -> list:
+    """Plain [{answer, score}] list from a visual_question_answering response"""
+    return [
+        {"answer": item["answer"], "score": item["score"]} if isinstance(item, dict)
+        else {"answer": item.answer, "score": item.score}
+        for item in output
+    ]
+
 class SimpleSwimlaneAnalyzer:
     """
     Using HuggingFace's InferenceClient - the modern way to use their API
@@ -15,22 +90,78 @@ class SimpleSwimlaneAnalyzer:
         if not self.token:
             raise ValueError("Please set HUGGINGFACE_HUB_TOKEN environment variable")
         
-        # Initialize the InferenceClient
-        self.client = InferenceClient(token=self.token)
+        # Initialize the AsyncInferenceClient so several model calls can run at once
+        self.client = AsyncInferenceClient(token=self.token)
+        self._warmup_task = None
+        self._circuit_failures = 0
+        self._circuit_status = None
+        self._circuit_opened_at = 0.0
+        self._circuit_trial_started = None
+    
+    @classmethod
+    async def create(cls):
+        """
+        Create an analyzer and start warming up its model endpoints
+        
+        The warm-up runs in the background, so cold starts overlap with
+        whatever the caller does before the first real request. Call close()
+        when done so it is awaited or cancelled along with the client.
+        """
+        analyzer = cls()
+        analyzer._warmup_task = asyncio.create_task(analyzer._warm_up())
+        return analyzer
+    
+    async def _warm_up(self):
+        """Send a tiny inference request to every model so its endpoint loads"""
+        image = _warmup_image()
+        results = await asyncio.gather(
+            *(self.client.image_to_text(image, model=model) for model in WARMUP_CAPTION_MODELS),
+            self.client.visual_question_answering(image=image, question="What is this?", model=VQA_MODEL),
+            return_exceptions=True
+        )
+        failed = sum(isinstance(result, Exception) for result in results)
+        if failed:
+            print(f"⚠️  Warm-up: {failed}/{len(results)} model endpoints did not respond")
+    
+    async def close(self):
+        """Stop any warm-up still in flight and close the inference client"""
+        if self._warmup_task is not None:
+            if not self._warmup_task.done():
+                self._warmup_task.cancel()
+            try:
+                await self._warmup_task
+            except asyncio.CancelledError:
+                pass
+            self._warmup_task = None
+        
+        close_client = getattr(self.client, "close", None)
+        if close_client is not None:
+            await close_client()
     
-    def analyze_image_simple(self, image_path: str, model: str = "Salesforce/blip-image-captioning-base"):
+    async def analyze_image_simple(self, image: Union[str, bytes], model: str = "Salesforce/blip-image-captioning-base"):
         """
         Analyze image with simple caption
+        
+        The image can be a file path or its raw bytes.
         """
-        print(f"\n🔍 Analyzing: {image_path}")
+        print(f"\n🔍 Analyzing: {image if isinstance(image, str) else f'{len(image)} bytes'}")
         print(f"🤖 Using model: {model}")
         
         try:
-            # Use the image_to_text method
-            result = self.client.image_to_text(
-                image_path,
-                model=model
-            )
+            image = self._load_image(image)
+            cache_key = self._cache_key(image, model)
+            result = self._cache_get(cache_key)
+            
+            if result is None:
+                self._check_circuit()
+                # Use the image_to_text method
+                output = await self.client.image_to_text(
+                    image,
+                    model=model
+                )
+                result = _caption_text(output)
+                self._record_success()
+                self._cache_put(cache_key, result)
             
             return {
                 "success": True,
@@ -40,25 +171,35 @@ class SimpleSwimlaneAnalyzer:
             }
             
         except Exception as e:
+            self._record_failure(e)
             return {
                 "success": False,
                 "error": str(e),
                 "model": model
             }
     
-    def analyze_with_question(self, image_path: str, question: str, model: str = "dandelin/vilt-b32-finetuned-vqa"):
+    async def analyze_with_question(self, image: Union[str, bytes], question: str, model: str = "dandelin/vilt-b32-finetuned-vqa"):
         """
         Visual Question Answering - ask specific questions about the image
         """
         print(f"\n❓ Question: {question}")
         
         try:
-            # Use visual_question_answering
-            result = self.client.visual_question_answering(
-                image=image_path,
-                question=question,
-                model=model
-            )
+            image = self._load_image(image)
+            cache_key = self._cache_key(image, model, question)
+            result = self._cache_get(cache_key)
+            
+            if result is None:
+                self._check_circuit()
+                # Use visual_question_answering
+                output = await self.client.visual_question_answering(
+                    image=image,
+                    question=question,
+                    model=model
+                )
+                result = _vqa_answers(output)
+                self._record_success()
+                self._cache_put(cache_key, result)
             
             return {
                 "success": True,
@@ -69,13 +210,103 @@ class SimpleSwimlaneAnalyzer:
             }
             
         except Exception as e:
+            self._record_failure(e)
             return {
                 "success": False,
                 "error": str(e),
                 "model": model
             }
     
-    def comprehensive_swimlane_analysis(self, image_path: str):
+    @property
+    def circuit_open(self) -> bool:
+        """Whether repeated auth/quota errors are currently stopping calls"""
+        if self._circuit_failures < CIRCUIT_BREAKER_THRESHOLD:
+            return False
+        if self._circuit_status == CIRCUIT_RATE_LIMIT_STATUS:
+            return time.monotonic() - self._circuit_opened_at < CIRCUIT_COOLDOWN_SECONDS
+        return True
+    
+    def _check_circuit(self):
+        """Refuse to make a call while the circuit is open"""
+        if self.circuit_open:
+            raise CircuitOpenError("Circuit open after repeated auth/quota errors; call skipped")
+        
+        if self._circuit_failures >= CIRCUIT_BREAKER_THRESHOLD:
+            # Cooled down after a 429: half-open, one trial call at a time. A
+            # trial that never reported back (e.g. cancelled) expires after a cooldown
+            now = time.monotonic()
+            if self._circuit_trial_started is not None and now - self._circuit_trial_started < CIRCUIT_COOLDOWN_SECONDS:
+                raise CircuitOpenError("Circuit half-open with a trial call in flight; call skipped")
+            self._circuit_trial_started = now
+    
+    def _record_success(self):
+        """Close the circuit after a call goes through"""
+        self._circuit_failures = 0
+        self._circuit_status = None
+        self._circuit_trial_started = None
+    
+    def _record_failure(self, error: Exception):
+        """Count auth/quota errors, opening the circuit once the threshold is reached"""
+        if isinstance(error, CircuitOpenError):
+            return
+        
+        was_trial = self._circuit_trial_started is not None
+        self._circuit_trial_started = None
+        status = _http_status(error)
+        if status not in CIRCUIT_AUTH_STATUSES and status != CIRCUIT_RATE_LIMIT_STATUS:
+            return
+        
+        self._circuit_failures += 1
+        if self._circuit_failures >= CIRCUIT_BREAKER_THRESHOLD:
+            self._circuit_status = status
+            self._circuit_opened_at = time.monotonic()
+            if was_trial or self._circuit_failures == CIRCUIT_BREAKER_THRESHOLD:
+                print(f"⚠️  Circuit opened (HTTP {status}), skipping remaining calls")
+    
+    def _load_image(self, image: Union[str, bytes]) -> bytes:
+        """Return the image bytes, reading the file if given a path"""
+        if isinstance(image, str):
+            with open(image, 'rb') as f:
+                return f.read()
+        return image
+    
+    def _cache_key(self, image: bytes, model: str, question: str = "") -> str:
+        """Content-addressed key for an inference request"""
+        return f"{hashlib.sha256(image).hexdigest()}|{model}|{question}"
+    
+    def _cache_connect(self) -> sqlite3.Connection:
+        """Open the result cache database, creating it if needed"""
+        os.makedirs(HF_CACHE_DIR, exist_ok=True)
+        conn = sqlite3.connect(os.path.join(HF_CACHE_DIR, "results.sqlite3"), timeout=10)
+        conn.execute("CREATE TABLE IF NOT EXISTS hfresults(key TEXT PRIMARY KEY, value TEXT)")
+        return conn
+    
+    def _cache_get(self, key: str) -> Optional[Any]:
+        """Look up a cached inference result; anything unreadable is a miss"""
+        try:
+            conn = self._cache_connect()
+            try:
+                row = conn.execute("SELECT value FROM hfresults WHERE key = ?", (key,)).fetchone()
+            finally:
+                conn.close()
+            return json.loads(row[0]) if row else None
+        except Exception as e:
+            print(f"⚠️  Could not read result cache: {e}")
+            return None
+    
+    def _cache_put(self, key: str, value: Any):
+        """Store an inference result"""
+        try:
+            conn = self._cache_connect()
+            try:
+                with conn:
+                    conn.execute("INSERT OR REPLACE INTO hfresults(key, value) VALUES (?, ?)", (key, json.dumps(value)))
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"⚠️  Could not write result cache: {e}")
+    
+    async def comprehensive_swimlane_analysis(self, image_path: str):
         """
         Comprehensive analysis using multiple approaches
         """
@@ -84,16 +315,39 @@ class SimpleSwimlaneAnalyzer:
         
         results = {}
         
-        # 1. Try different caption models
-        caption_models = [
-            "Salesforce/blip-image-captioning-base",
-            "Salesforce/blip-image-captioning-large",
-            "nlpconnect/vit-gpt2-image-captioning"
+        # An earlier run already hit auth/quota errors; every call would fail the same way
+        if self.circuit_open:
+            print("⚠️  Circuit opened, skipping remaining calls")
+            return results
+        
+        # Read the image once and share the buffer with every request
+        with open(image_path, 'rb') as f:
+            image_bytes = f.read()
+        
+        caption_models = CAPTION_MODELS
+        
+        questions = [
+            "What type of diagram is this?",
+            "How many swimlanes are in this diagram?",
+            "What departments are shown?",
+            "Describe the process flow."
+        ]
+        
+        vqa_model = VQA_MODEL
+        
+        # Fire every caption and VQA request at once so their round-trips overlap
+        tasks = [self.analyze_image_simple(image_bytes, model) for model in caption_models] + [
+            self.analyze_with_question(image_bytes, question, vqa_model) for question in questions
         ]
+        results_list = await asyncio.gather(*tasks, return_exceptions=True)
+        caption_results = results_list[:len(caption_models)]
+        vqa_results = results_list[len(caption_models):]
         
+        # 1. Caption models
         print("\n1️⃣ Testing Caption Models:")
-        for model in caption_models:
-            result = self.analyze_image_simple(image_path, model)
+        for model, result in zip(caption_models, caption_results):
+            if isinstance(result, Exception):
+                result = {"success": False, "error": str(result), "model": model}
             results[f"caption_{model.split('/')[-1]}"] = result
             
             if result["success"]:
@@ -101,19 +355,12 @@ class SimpleSwimlaneAnalyzer:
             else:
                 print(f"❌ {model}: {result['error']}")
         
-        # 2. Try Visual Question Answering
+        # 2. Visual Question Answering
         print("\n2️⃣ Visual Question Answering:")
-        questions = [
-            "What type of diagram is this?",
-            "How many swimlanes are in this diagram?",
-            "What departments are shown?",
-            "Describe the process flow."
-        ]
-        
-        vqa_model = "dandelin/vilt-b32-finetuned-vqa"
-        for question in questions:
-            result = self.analyze_with_question(image_path, question, vqa_model)
-            results[f"vqa_{questions.index(question)}"] = result
+        for idx, (question, result) in enumerate(zip(questions, vqa_results)):
+            if isinstance(result, Exception):
+                result = {"success": False, "error": str(result), "model": vqa_model}
+            results[f"vqa_{idx}"] = result
             
             if result["success"]:
                 print(f"✅ Q: {question}")
@@ -123,31 +370,55 @@ class SimpleSwimlaneAnalyzer:
         
         return results
     
-    def get_best_caption(self, image_path: str):
+    async def get_best_caption(self, image_path: str):
         """
         Get the best available caption from working models
         """
-        # Try models in order of preference
-        models = [
-            "Salesforce/blip-image-captioning-large",
-            "Salesforce/blip-image-captioning-base",
-            "nlpconnect/vit-gpt2-image-captioning",
-            "microsoft/git-base"
-        ]
+        models = BEST_CAPTION_MODELS
         
-        for model in models:
-            result = self.analyze_image_simple(image_path, model)
-            if result["success"]:
-                return result
+        with open(image_path, 'rb') as f:
+            image_bytes = f.read()
+        
+        # Query every model at once and keep whichever answers successfully first
+        tasks = [asyncio.create_task(self.analyze_image_simple(image_bytes, model)) for model in models]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                result = await next_result
+                if result["success"]:
+                    return result
+        finally:
+            for task in tasks:
+                task.cancel()
         
         return {"success": False, "error": "No models worked"}
 
 
-def main():
+def make_chunk(result):
+    """Build a vector DB chunk from a successful caption or VQA result"""
+    if result["type"] == "simple_caption":
+        return {
+            "content": f"Swimlane diagram description: {result['caption']}",
+            "metadata": {"type": "caption", "model": result["model"]}
+        }
+    return {
+        "content": f"Q: {result['question']} A: {result['answer']}",
+        "metadata": {"type": "vqa", "question": result["question"]}
+    }
+
+
+async def run_analyzer():
     """Test the analyzer"""
     
-    # Initialize
-    analyzer = SimpleSwimlaneAnalyzer()
+    # Initialize; model endpoints start warming up immediately
+    analyzer = await SimpleSwimlaneAnalyzer.create()
+    try:
+        await run_tests(analyzer)
+    finally:
+        await analyzer.close()
+
+
+async def run_tests(analyzer: SimpleSwimlaneAnalyzer):
+    """Run the caption test and, if requested, the comprehensive analysis"""
     
     # Your image path
     image_path = "media/swim_lane.png"  # Change to your path
@@ -157,7 +428,7 @@ def main():
     
     # Option 1: Simple analysis
     print("\n📝 SIMPLE CAPTION TEST")
-    result = analyzer.get_best_caption(image_path)
+    result = await analyzer.get_best_caption(image_path)
     
     if result.get("success"):
         print(f"\n✅ Best Caption Result:")
@@ -168,10 +439,12 @@ def main():
     
     # Option 2: Full analysis
     print("\n" + "="*60)
-    user_input = input("\nRun comprehensive analysis? (y/n): ")
+    user_input = await asyncio.get_running_loop().run_in_executor(
+        None, input, "\nRun comprehensive analysis? (y/n): "
+    )
     
     if user_input.lower() == 'y':
-        results = analyzer.comprehensive_swimlane_analysis(image_path)
+        results = await analyzer.comprehensive_swimlane_analysis(image_path)
         
         # Prepare for vector DB
         print("\n💾 VECTOR DB PREPARATION:")
@@ -181,26 +454,19 @@ def main():
         
         if successful_results:
             # Create chunks for vector DB
-            chunks = []
-            
-            # Add captions
-            for result in successful_results:
-                if result["type"] == "simple_caption":
-                    chunks.append({
-                        "content": f"Swimlane diagram description: {result['caption']}",
-                        "metadata": {"type": "caption", "model": result["model"]}
-                    })
-                elif result["type"] == "vqa":
-                    chunks.append({
-                        "content": f"Q: {result['question']} A: {result['answer']}",
-                        "metadata": {"type": "vqa", "question": result["question"]}
-                    })
+            chunks = [make_chunk(result) for result in successful_results]
             
-            print(f"\n✅ Created {len(chunks)} chunks for vector DB:")
-            for i, chunk in enumerate(chunks[:3]):  # Show first 3
-                print(f"\nChunk {i+1}:")
-                print(f"Content: {chunk['content'][:100]}...")
-                print(f"Type: {chunk['metadata']['type']}")
+            # Show the first 3 in a single write
+            preview = "\n".join(
+                f"\nChunk {i+1}:\nContent: {chunk['content'][:100]}...\nType: {chunk['metadata']['type']}"
+                for i, chunk in enumerate(chunks[:3])
+            )
+            print(f"\n✅ Created {len(chunks)} chunks for vector DB:\n{preview}")
+
+
+def main():
+    """Run the analyzer test on a single event loop"""
+    asyncio.run(run_analyzer())
 
 
 if __name__ == "__main__":
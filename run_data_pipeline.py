@@ -13,6 +13,8 @@ import asyncio
 import os
 import sys
 import argparse
+import time
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, Any, Optional
@@ -24,6 +26,12 @@ sys.path.insert(0, str(backend_dir))
 from backend.services.rag_pipeline import RAGPipeline
 from backend.services.text_parser import TextParser
 
+# Shared services, built lazily so their setup is paid once per process
+_PARSER: Optional[TextParser] = None
+_PARSER_LOCK = asyncio.Lock()
+_RAG_PIPELINE: Optional[RAGPipeline] = None
+_RAG_PIPELINE_LOCK = asyncio.Lock()
+
 # Colors for terminal output
 class Colors:
     HEADER = '\033[95m'
@@ -35,9 +43,48 @@ class Colors:
     ENDC = '\033[0m'
     BOLD = '\033[1m'
 
+# Escape sequences for every color, built once; output that isn't a terminal
+# (CI logs, pipes) is written without them
+_IS_TTY = sys.stdout.isatty()
+_WRAPPED = {
+    color: (color, Colors.ENDC) if _IS_TTY else ("", "")
+    for name, color in vars(Colors).items() if not name.startswith('_')
+}
+
 def print_colored(message, color=Colors.OKBLUE):
     """Print colored message to terminal"""
-    print(f"{color}{message}{Colors.ENDC}")
+    prefix, suffix = _WRAPPED.get(color, ("", ""))
+    sys.stdout.write(f"{prefix}{message}{suffix}\n")
+
+async def get_parser() -> TextParser:
+    """Return the shared text parser, creating it on first use"""
+    global _PARSER
+    async with _PARSER_LOCK:
+        if _PARSER is None:
+            _PARSER = TextParser()
+        return _PARSER
+
+async def get_rag_pipeline() -> RAGPipeline:
+    """Return the shared RAG pipeline, creating it on first use"""
+    global _RAG_PIPELINE
+    async with _RAG_PIPELINE_LOCK:
+        if _RAG_PIPELINE is None:
+            # Loading the embedding model blocks, so keep it off the event loop
+            _RAG_PIPELINE = await asyncio.get_running_loop().run_in_executor(None, RAGPipeline)
+        return _RAG_PIPELINE
+
+@lru_cache(maxsize=None)
+def get_pinecone_client():
+    """Return the shared Pinecone client, creating it on first use"""
+    from dotenv import load_dotenv
+    from pinecone import Pinecone
+    
+    load_dotenv()
+    api_key = os.getenv("PINECONE_API_KEY")
+    if not api_key:
+        raise ValueError("PINECONE_API_KEY environment variable is required")
+    
+    return Pinecone(api_key=api_key)
 
 def print_banner():
     """Print pipeline banner"""
@@ -56,18 +103,8 @@ def clear_vector_database():
     try:
         print_colored("🧹 Clearing vector database...", Colors.WARNING)
         
-        # Import and use the clear function
-        from dotenv import load_dotenv
-        from pinecone import Pinecone
-        
-        load_dotenv()
-        api_key = os.getenv("PINECONE_API_KEY")
+        pc = get_pinecone_client()
         index_name = os.getenv("PINECONE_INDEX_NAME", "dev-portal-chatbot")
-        
-        if not api_key:
-            raise ValueError("PINECONE_API_KEY environment variable is required")
-        
-        pc = Pinecone(api_key=api_key)
         index = pc.Index(index_name)
         
         # Get current stats
@@ -83,7 +120,11 @@ def clear_vector_database():
         
         index.delete(delete_all=True)
         
-        # Verify deletion
+        # Verifying costs another stats round-trip, so it is opt-in
+        if not os.getenv("VERIFY_CLEAR"):
+            print_colored("✅ Delete request sent (set VERIFY_CLEAR=1 to confirm the count)", Colors.OKGREEN)
+            return
+        
         new_stats = index.describe_index_stats()
         if new_stats.total_vector_count == 0:
             print_colored("✅ Successfully cleared vector database", Colors.OKGREEN)
@@ -94,13 +135,16 @@ def clear_vector_database():
         print_colored(f"❌ Error clearing vector database: {e}", Colors.FAIL)
         raise
 
-async def process_html_content(html_file: str, source_name: str) -> Dict[str, Any]:
+async def process_html_content(html_file: str, source_name: str,
+                               batch_size: int = 64, pool_threads: int = 30) -> Dict[str, Any]:
     """
     Process HTML content through the complete pipeline
     
     Args:
         html_file: Path to HTML file
         source_name: Name identifier for the content source
+        batch_size: Chunks per embedding batch and per Pinecone upsert
+        pool_threads: Maximum concurrent Pinecone upsert requests
         
     Returns:
         Complete processing results
@@ -117,7 +161,7 @@ async def process_html_content(html_file: str, source_name: str) -> Dict[str, An
         # Step 2: Enhanced parsing with OpenAPI detection
         print_colored("🔍 Parsing content (Text + Images + OpenAPI)...", Colors.OKBLUE)
         
-        parser = TextParser()
+        parser = await get_parser()
         parse_result = parser.parse_html_to_markdown(html_content)
         
         # Display parsing results
@@ -135,13 +179,18 @@ async def process_html_content(html_file: str, source_name: str) -> Dict[str, An
         
         # Save markdown content
         markdown_file = parser.save_markdown_file(parse_result['markdown_content'])
+        parse_result['markdown_file'] = markdown_file
         print_colored(f"   📝 Markdown saved: {markdown_file}", Colors.OKGREEN)
         
-        # Step 3: RAG Pipeline Processing
+        # Step 3: RAG Pipeline Processing (reuses the parse above)
         print_colored("⚡ Processing through RAG pipeline...", Colors.OKBLUE)
         
-        rag_pipeline = RAGPipeline()
-        rag_result = await rag_pipeline.process_and_store_html(html_content, source_name)
+        rag_pipeline = await get_rag_pipeline()
+        ingest_start = time.perf_counter()
+        rag_result = await rag_pipeline.process_and_store_parsed(
+            parse_result, source_name, batch_size=batch_size, pool_threads=pool_threads
+        )
+        ingest_seconds = time.perf_counter() - ingest_start
         
         # Display RAG results
         processing = rag_result['processing']
@@ -151,6 +200,7 @@ async def process_html_content(html_file: str, source_name: str) -> Dict[str, An
         print_colored(f"   📝 Text chunks: {processing['text_chunks']}", Colors.OKBLUE)
         print_colored(f"   🖼️  Image chunks: {processing['image_chunks']}", Colors.OKBLUE)
         print_colored(f"   💾 Stored successfully: {storage['successful_upserts']}/{processing['total_chunks']}", Colors.OKGREEN)
+        print_colored(f"   ⏱️  Ingest time: {ingest_seconds:.2f}s (batch size {batch_size}, {pool_threads} upsert threads)", Colors.OKBLUE)
         
         if storage['failed_upserts'] > 0:
             print_colored(f"   ⚠️  Failed to store: {storage['failed_upserts']} chunks", Colors.WARNING)
@@ -177,7 +227,7 @@ async def verify_results(source_name: str):
     try:
         print_colored("🔍 Verifying results with test searches...", Colors.OKBLUE)
         
-        rag_pipeline = RAGPipeline()
+        rag_pipeline = await get_rag_pipeline()
         
         # Test queries
         test_queries = [
@@ -187,12 +237,15 @@ async def verify_results(source_name: str):
             "Tell me about the delivery process"
         ]
         
-        for i, query in enumerate(test_queries, 1):
+        # Fetch the index statistics while the searches run
+        status_task = asyncio.create_task(rag_pipeline.get_pipeline_status())
+        
+        # Embed all queries in one batch and run the searches concurrently
+        gathered = await rag_pipeline.search_many(test_queries, top_k=2)
+        
+        for i, (query, results) in enumerate(zip(test_queries, gathered), 1):
             print_colored(f"   Query {i}: {query}", Colors.OKCYAN)
             
-            # Search for similar content
-            results = await rag_pipeline.search_similar_content(query, top_k=2)
-            
             if results:
                 print_colored(f"   ✅ Found {len(results)} relevant chunks", Colors.OKGREEN)
                 for j, result in enumerate(results, 1):
@@ -205,7 +258,7 @@ async def verify_results(source_name: str):
                 print_colored(f"   ❌ No results found", Colors.WARNING)
         
         # Get final statistics
-        status = await rag_pipeline.get_pipeline_status()
+        status = await status_task
         if 'stats' in status.get('vector_store', {}):
             stats = status['vector_store']['stats']
             total_vectors = stats.get('total_vector_count', 'N/A')
@@ -214,7 +267,8 @@ async def verify_results(source_name: str):
     except Exception as e:
         print_colored(f"⚠️  Error during verification: {e}", Colors.WARNING)
 
-async def run_pipeline(html_file: str, source_name: str, clear_db: bool = False):
+async def run_pipeline(html_file: str, source_name: str, clear_db: bool = False,
+                       batch_size: int = 64, pool_threads: int = 30):
     """Run the complete end-to-end pipeline"""
     
     print_banner()
@@ -229,7 +283,7 @@ async def run_pipeline(html_file: str, source_name: str, clear_db: bool = False)
     
     # Step 2: Process content
     try:
-        result = await process_html_content(html_file, source_name)
+        result = await process_html_content(html_file, source_name, batch_size, pool_threads)
         
         if not result['success']:
             print_colored("❌ Pipeline failed during processing", Colors.FAIL)
@@ -307,6 +361,20 @@ Examples:
         help="Clear vector database before processing new content"
     )
     
+    parser.add_argument(
+        "--batch-size", "-b",
+        type=int,
+        default=64,
+        help="Chunks per embedding batch and per Pinecone upsert (default: 64)"
+    )
+    
+    parser.add_argument(
+        "--pool-threads", "-p",
+        type=int,
+        default=30,
+        help="Maximum concurrent Pinecone upsert requests (default: 30)"
+    )
+    
     args = parser.parse_args()
     
     # Validate HTML file
@@ -321,7 +389,9 @@ Examples:
     
     # Run the pipeline
     try:
-        success = asyncio.run(run_pipeline(args.html_file, source_name, args.clear_db))
+        success = asyncio.run(run_pipeline(
+            args.html_file, source_name, args.clear_db, args.batch_size, args.pool_threads
+        ))
         sys.exit(0 if success else 1)
         
     except KeyboardInterrupt:
@@ -4,12 +4,10 @@ Startup script for the Development Portal Q&A System
 This script starts both the FastAPI backend and Streamlit frontend
 """
 
-import subprocess
+import asyncio
 import os
 import sys
-import time
 import signal
-import threading
 from pathlib import Path
 
 # Configuration
@@ -17,6 +15,7 @@ BACKEND_PORT = 8000
 FRONTEND_PORT = 8501
 BACKEND_DIR = "backend"
 FRONTEND_DIR = "frontend"
+READ_CHUNK_SIZE = 65536
 
 # Colors for terminal output
 class Colors:
@@ -30,9 +29,18 @@ class Colors:
     BOLD = '\033[1m'
     UNDERLINE = '\033[4m'
 
+# Escape sequences for every color, built once; output that isn't a terminal
+# (CI logs, pipes) is written without them
+_IS_TTY = sys.stdout.isatty()
+_WRAPPED = {
+    color: (color, Colors.ENDC) if _IS_TTY else ("", "")
+    for name, color in vars(Colors).items() if not name.startswith('_')
+}
+
 def print_colored(message, color=Colors.OKBLUE):
     """Print colored message to terminal"""
-    print(f"{color}{message}{Colors.ENDC}")
+    prefix, suffix = _WRAPPED.get(color, ("", ""))
+    sys.stdout.write(f"{prefix}{message}{suffix}\n")
 
 def print_banner():
     """Print startup banner"""
@@ -109,7 +117,7 @@ def check_environment():
     
     return True
 
-def start_backend():
+async def start_backend():
     """Start the FastAPI backend"""
     print_colored(f"🚀 Starting FastAPI backend on port {BACKEND_PORT}...", Colors.OKBLUE)
     
@@ -127,13 +135,11 @@ def start_backend():
             "--log-level", "info"
         ]
         
-        process = subprocess.Popen(
-            cmd,
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
             cwd=backend_path,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            universal_newlines=True,
-            bufsize=1
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT
         )
         
         return process
@@ -142,7 +148,7 @@ def start_backend():
         print_colored(f"❌ Failed to start backend: {e}", Colors.FAIL)
         return None
 
-def start_frontend():
+async def start_frontend():
     """Start the Streamlit frontend"""
     print_colored(f"🎨 Starting Streamlit frontend on port {FRONTEND_PORT}...", Colors.OKBLUE)
     
@@ -159,13 +165,11 @@ def start_frontend():
             "--server.headless", "true"
         ]
         
-        process = subprocess.Popen(
-            cmd,
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
             cwd=frontend_path,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            universal_newlines=True,
-            bufsize=1
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT
         )
         
         return process
@@ -174,46 +178,70 @@ def start_frontend():
         print_colored(f"❌ Failed to start frontend: {e}", Colors.FAIL)
         return None
 
-def monitor_process(process, name, color=Colors.OKBLUE):
-    """Monitor a process and print its output"""
+async def stream_logs(process, name, color=Colors.OKBLUE):
+    """Print a process's output line by line until it closes its stdout"""
+    # Read fixed-size chunks rather than lines, so one overlong line can't hit
+    # the reader's line limit and leave the pipe undrained
+    partial = b""
     try:
-        for line in iter(process.stdout.readline, ''):
-            if line:
-                print_colored(f"[{name}] {line.strip()}", color)
+        while True:
+            data = await process.stdout.read(READ_CHUNK_SIZE)
+            if not data:
+                break
+            *lines, partial = (partial + data).split(b"\n")
+            for line in lines:
+                print_colored(f"[{name}] {line.decode(errors='replace').strip()}", color)
+        
+        if partial:
+            print_colored(f"[{name}] {partial.decode(errors='replace').strip()}", color)
     except Exception as e:
         print_colored(f"❌ Error monitoring {name}: {e}", Colors.FAIL)
 
-def main():
-    """Main function to start the Q&A system"""
-    print_banner()
-    
-    # Check requirements
-    if not check_requirements():
-        print_colored("❌ System requirements check failed. Please fix the issues and try again.", Colors.FAIL)
-        sys.exit(1)
-    
-    # Check environment
-    if not check_environment():
-        print_colored("❌ Environment check failed. Please fix the issues and try again.", Colors.FAIL)
-        sys.exit(1)
-    
-    print_colored("✅ All checks passed! Starting services...", Colors.OKGREEN)
+def stop_process(process):
+    """Terminate a process if it is still running"""
+    if process.returncode is None:
+        try:
+            process.terminate()
+        except ProcessLookupError:
+            pass
+
+async def run_services():
+    """Start both services and supervise them until one exits or a signal arrives"""
+    # Ctrl+C and SIGTERM wake the supervisor instead of killing the loop; set
+    # up before spawning so a signal can never leave the children orphaned
+    loop = asyncio.get_running_loop()
+    shutdown = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, shutdown.set)
+        except NotImplementedError:
+            # Windows event loops have no add_signal_handler
+            signal.signal(sig, lambda *_: loop.call_soon_threadsafe(shutdown.set))
     
     # Start processes
-    backend_process = start_backend()
+    backend_process = await start_backend()
     if not backend_process:
         print_colored("❌ Failed to start backend. Exiting...", Colors.FAIL)
-        sys.exit(1)
+        return False
+    log_tasks = [asyncio.create_task(stream_logs(backend_process, "Backend", Colors.OKBLUE))]
     
     # Give backend time to start
     print_colored("⏳ Waiting for backend to initialize...", Colors.OKBLUE)
-    time.sleep(3)
+    try:
+        await asyncio.wait_for(shutdown.wait(), timeout=3)
+    except asyncio.TimeoutError:
+        pass
     
-    frontend_process = start_frontend()
+    frontend_process = None if shutdown.is_set() else await start_frontend()
     if not frontend_process:
-        print_colored("❌ Failed to start frontend. Stopping backend...", Colors.FAIL)
-        backend_process.terminate()
-        sys.exit(1)
+        if shutdown.is_set():
+            print_colored("\n🛑 Shutting down services...", Colors.WARNING)
+        else:
+            print_colored("❌ Failed to start frontend. Stopping backend...", Colors.FAIL)
+        stop_process(backend_process)
+        await backend_process.wait()
+        await asyncio.gather(*log_tasks, return_exceptions=True)
+        return shutdown.is_set()
     
     # Print access information
     print_colored("\n" + "="*60, Colors.OKGREEN)
@@ -231,58 +259,54 @@ def main():
     print_colored("- GOOGLE_API_KEY (optional, for Gemini)", Colors.WARNING)
     print_colored("\n")
     
-    # Set up signal handlers
-    def signal_handler(sig, frame):
-        print_colored("\n🛑 Shutting down services...", Colors.WARNING)
-        backend_process.terminate()
-        frontend_process.terminate()
-        print_colored("✅ Services stopped. Goodbye!", Colors.OKGREEN)
-        sys.exit(0)
-    
-    signal.signal(signal.SIGINT, signal_handler)
-    signal.signal(signal.SIGTERM, signal_handler)
+    log_tasks.append(asyncio.create_task(stream_logs(frontend_process, "Frontend", Colors.OKCYAN)))
+    backend_wait = asyncio.create_task(backend_process.wait())
+    frontend_wait = asyncio.create_task(frontend_process.wait())
+    shutdown_wait = asyncio.create_task(shutdown.wait())
     
-    # Start monitoring threads
-    backend_thread = threading.Thread(
-        target=monitor_process,
-        args=(backend_process, "Backend", Colors.OKBLUE),
-        daemon=True
+    # React as soon as either service exits or a shutdown is requested
+    done, pending = await asyncio.wait(
+        {backend_wait, frontend_wait, shutdown_wait},
+        return_when=asyncio.FIRST_COMPLETED
     )
     
-    frontend_thread = threading.Thread(
-        target=monitor_process,
-        args=(frontend_process, "Frontend", Colors.OKCYAN),
-        daemon=True
-    )
-    
-    backend_thread.start()
-    frontend_thread.start()
-    
-    # Keep the main thread alive
-    try:
-        while True:
-            time.sleep(1)
-            
-            # Check if processes are still running
-            if backend_process.poll() is not None:
-                print_colored("❌ Backend process stopped unexpectedly", Colors.FAIL)
-                break
-            
-            if frontend_process.poll() is not None:
-                print_colored("❌ Frontend process stopped unexpectedly", Colors.FAIL)
-                break
-                
-    except KeyboardInterrupt:
-        pass
+    if shutdown_wait in done:
+        print_colored("\n🛑 Shutting down services...", Colors.WARNING)
+    elif backend_wait in done:
+        print_colored("❌ Backend process stopped unexpectedly", Colors.FAIL)
+    else:
+        print_colored("❌ Frontend process stopped unexpectedly", Colors.FAIL)
     
     # Cleanup
     print_colored("\n🧹 Cleaning up...", Colors.WARNING)
-    if backend_process.poll() is None:
-        backend_process.terminate()
-    if frontend_process.poll() is None:
-        frontend_process.terminate()
+    stop_process(backend_process)
+    stop_process(frontend_process)
+    await asyncio.gather(backend_process.wait(), frontend_process.wait())
+    
+    shutdown_wait.cancel()
+    await asyncio.gather(*log_tasks, return_exceptions=True)
     
     print_colored("✅ Cleanup complete. Goodbye!", Colors.OKGREEN)
+    return True
+
+def main():
+    """Main function to start the Q&A system"""
+    print_banner()
+    
+    # Check requirements
+    if not check_requirements():
+        print_colored("❌ System requirements check failed. Please fix the issues and try again.", Colors.FAIL)
+        sys.exit(1)
+    
+    # Check environment
+    if not check_environment():
+        print_colored("❌ Environment check failed. Please fix the issues and try again.", Colors.FAIL)
+        sys.exit(1)
+    
+    print_colored("✅ All checks passed! Starting services...", Colors.OKGREEN)
+    
+    if not asyncio.run(run_services()):
+        sys.exit(1)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()